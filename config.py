@@ -8,12 +8,18 @@ SERVO_MIN = 150  # Min pulse length (0 degrees)
 SERVO_MAX = 600  # Max pulse length (180 degrees)
 SERVO_FREQ = 50  # PWM frequency for servos (50Hz standard)
 SERVO_CHANNELS = [0, 1, 2, 3]  # Servo channels to control
+NUM_SERVOS = max(SERVO_CHANNELS) + 1  # Size of per-channel arrays, indexed by channel number
 
 # I2C configuration
 I2C_BUSES = [0, 1]  # I2C buses to check
 
 # Database configuration
 DB_PATH = 'servo_data.db'
+LOG_TABLE = 'servo_log_entries'  # JSON-format log table; servo_controller.py's columnar servo_logs shares the file
+LOG_RETENTION_ROWS = 100000  # Only the newest rows are kept in LOG_TABLE
+LOG_BATCH_SIZE = 500  # Max rows written per transaction
+LOG_FLUSH_INTERVAL = 0.2  # Max seconds a row waits before being written
+LOG_QUEUE_SIZE = 4096  # Oldest rows are dropped beyond this backlog
 
 # PS3 controller button mappings based on test log
 PS3_BUTTON_MAPPINGS = {
@@ -49,14 +55,17 @@ PS3_AXIS_MAPPINGS = {
     17: "D-pad Y",
 }
 
-# Direction arrows for display
-DIRECTION_ARROWS = {
-    "up": "↑", 
-    "down": "↓",
-    "left": "←", 
-    "right": "→",
-    "neutral": "○"
-}
+# Direction codes, indexing DIRECTION_NAMES and DIRECTION_ARROW_BY_CODE
+DIR_NEUTRAL = 0
+DIR_UP = 1
+DIR_DOWN = 2
+DIR_LEFT = 3
+DIR_RIGHT = 4
+DIRECTION_NAMES = ("neutral", "up", "down", "left", "right")
+DIRECTION_ARROW_BY_CODE = ("○", "↑", "↓", "←", "→")
+
+# Direction arrows for display, by direction name
+DIRECTION_ARROWS = dict(zip(DIRECTION_NAMES, DIRECTION_ARROW_BY_CODE))
 
 # Web server settings
 WEB_HOST = '0.0.0.0'
@@ -3,8 +3,11 @@
 Controller input handling for servo controller.
 """
 
+import array
 import evdev
 from evdev import InputDevice, ecodes
+import os
+import select
 import time
 import sys
 
@@ -13,17 +16,58 @@ from logger import main_logger, debug_logger
 from hardware import (
     move_servo, 
     move_all_servos, 
-    servo_speed, 
     hold_state, 
-    lock_state
+    invalidate_hardware_status,
+    toggle_lock_state,
+    adjust_servo_speed
 )
 
+# Joystick axis code -> servo channel for each controller layout
+PS3_AXIS_CHANNELS = {
+    0: 0,  # Left Stick X
+    1: 1,  # Left Stick Y
+    2: 2,  # Right Stick X (Z)
+    3: 3,  # Right Stick Y (RX)
+}
+XBOX_AXIS_CHANNELS = {
+    0: 0,  # Left Stick X
+    1: 1,  # Left Stick Y
+    4: 2,  # Right Stick Y
+    5: 3,  # Right Stick X
+}
+
+# Xbox button names for the debug log
+XBOX_BUTTON_NAMES = {
+    ecodes.BTN_SOUTH: "A",
+    ecodes.BTN_EAST: "B",
+    ecodes.BTN_WEST: "X",
+    ecodes.BTN_NORTH: "Y",
+    ecodes.BTN_TL: "Left Shoulder",
+    ecodes.BTN_TR: "Right Shoulder",
+    ecodes.BTN_SELECT: "Select/Back",
+    ecodes.BTN_START: "Start",
+    ecodes.BTN_MODE: "Xbox Button",
+    ecodes.BTN_THUMBL: "Left Thumb",
+    ecodes.BTN_THUMBR: "Right Thumb",
+}
+
+# Button names by controller type, anything else uses the Xbox names
+BUTTON_NAMES = {'PS3': PS3_BUTTON_MAPPINGS, 'PS': PS3_BUTTON_MAPPINGS}
+
+# Stick moves smaller than this aren't written to debug.log
+STICK_LOG_DEADBAND = 2000
+
 # Controller state
 controller_type = None
 controller_connected = False
 q_pressed = False
 exit_flag = False
 
+# Written by stop_controller_input() to wake the controller loop at once
+exit_wake_r, exit_wake_w = os.pipe()
+os.set_blocking(exit_wake_r, False)
+os.set_blocking(exit_wake_w, False)
+
 def find_game_controller(device_path=None):
     """Find and return a PlayStation or Xbox controller device"""
     global controller_type, controller_connected
@@ -80,168 +124,214 @@ def log_controller_event(event_type, code, value, description=""):
     try:
         if event_type == ecodes.EV_KEY:
             # Log button events
-            btn_name = "Unknown"
-            if controller_type == 'PS3' or controller_type == 'PS':
-                btn_name = PS3_BUTTON_MAPPINGS.get(code, f"Unknown ({code})")
-            else:
-                # Xbox button names
-                btn_names = {
-                    ecodes.BTN_SOUTH: "A",
-                    ecodes.BTN_EAST: "B",
-                    ecodes.BTN_WEST: "X",
-                    ecodes.BTN_NORTH: "Y",
-                    ecodes.BTN_TL: "Left Shoulder",
-                    ecodes.BTN_TR: "Right Shoulder",
-                    ecodes.BTN_SELECT: "Select/Back",
-                    ecodes.BTN_START: "Start",
-                    ecodes.BTN_MODE: "Xbox Button",
-                    ecodes.BTN_THUMBL: "Left Thumb",
-                    ecodes.BTN_THUMBR: "Right Thumb",
-                }
-                btn_name = btn_names.get(code, f"Unknown ({code})")
+            btn_name = BUTTON_NAMES.get(controller_type, XBOX_BUTTON_NAMES).get(code)
+            if btn_name is None:
+                btn_name = f"Unknown ({code})"
             
             btn_state = "Pressed" if value == 1 else "Released" if value == 0 else "Held"
-            debug_logger.info(f"BUTTON - {btn_name} - {btn_state} - Code: {code}")
+            debug_logger.info("BUTTON - %s - %s - Code: %s", btn_name, btn_state, code)
             
         elif event_type == ecodes.EV_ABS:
             # Log joystick/axis events
-            axis_name = PS3_AXIS_MAPPINGS.get(code, f"Unknown Axis ({code})")
-            debug_logger.info(f"AXIS - {axis_name} - Value: {value}")
+            axis_name = PS3_AXIS_MAPPINGS.get(code)
+            if axis_name is None:
+                axis_name = f"Unknown Axis ({code})"
+            debug_logger.info("AXIS - %s - Value: %s", axis_name, value)
         
         # Add additional custom description if provided
         if description:
-            debug_logger.info(f"INFO - {description}")
+            debug_logger.info("INFO - %s", description)
     except Exception as e:
         main_logger.error(f"Error logging controller event: {e}")
 
+def toggle_hold(channel):
+    """Toggle the hold state of a servo"""
+    hold_state[channel] = not hold_state[channel]
+    invalidate_hardware_status()
+
+def decrease_speed():
+    """Slow the servos down by 0.1x"""
+    servo_speed = adjust_servo_speed(-1)
+    print(f"\nSpeed decreased to {servo_speed:.1f}x")
+
+def increase_speed():
+    """Speed the servos up by 0.1x"""
+    servo_speed = adjust_servo_speed(1)
+    print(f"\nSpeed increased to {servo_speed:.1f}x")
+
+def toggle_lock():
+    """Lock or unlock all servos"""
+    status = "LOCKED" if toggle_lock_state() else "UNLOCKED"
+    print(f"\nServos now {status}")
+
+def request_exit(button):
+    """Exit once the given button has been pressed twice"""
+    global q_pressed, exit_flag
+    if q_pressed:
+        print(f"\n{button} pressed twice. Exiting...")
+        exit_flag = True
+    else:
+        q_pressed = True
+        print(f"\nPress {button} again to exit...")
+
+# Button code -> action for each controller layout (PS3 codes from test log)
+PS3_BUTTON_ACTIONS = {
+    304: lambda: toggle_hold(0),          # Cross (✕)
+    305: lambda: toggle_hold(1),          # Circle (○)
+    308: lambda: toggle_hold(2),          # Square (□)
+    307: lambda: toggle_hold(3),          # Triangle (△)
+    294: decrease_speed,                  # L1
+    295: increase_speed,                  # R1
+    298: lambda: move_all_servos(0),      # L2
+    299: lambda: move_all_servos(180),    # R2
+    291: lambda: move_all_servos(90),     # Start
+    300: lambda: move_all_servos(90),     # D-pad Up
+    302: toggle_lock,                     # D-pad Down
+    303: lambda: move_all_servos(0),      # D-pad Left
+    301: lambda: move_all_servos(180),    # D-pad Right
+    292: lambda: request_exit("PS button"),  # PS Button
+}
+XBOX_BUTTON_ACTIONS = {
+    ecodes.BTN_SOUTH: lambda: toggle_hold(0),             # A
+    ecodes.BTN_EAST: lambda: toggle_hold(1),              # B
+    ecodes.BTN_WEST: lambda: toggle_hold(2),              # X
+    ecodes.BTN_NORTH: lambda: toggle_hold(3),             # Y
+    ecodes.BTN_TL: decrease_speed,                        # Left Shoulder
+    ecodes.BTN_TR: increase_speed,                        # Right Shoulder
+    ecodes.BTN_DPAD_UP: lambda: move_all_servos(90),      # Up D-pad
+    ecodes.BTN_DPAD_DOWN: toggle_lock,                    # Down D-pad
+    ecodes.BTN_DPAD_LEFT: lambda: move_all_servos(0),     # Left D-pad
+    ecodes.BTN_DPAD_RIGHT: lambda: move_all_servos(180),  # Right D-pad
+    ecodes.KEY_Q: lambda: request_exit("Q"),              # Q key for exit
+}
+
+# Number of EV_ABS codes (the kernel's ABS_CNT), every event code is below it
+ABS_CODE_COUNT = 64
+
+def build_axis_index(axis_channels):
+    """Build an array mapping every EV_ABS code to its servo channel, or -1"""
+    axis_index = array.array('b', [-1] * ABS_CODE_COUNT)
+    for code, channel in axis_channels.items():
+        axis_index[code] = channel
+    return axis_index
+
+# Dispatch tables by controller type, anything else uses the Xbox layout
+AXIS_CHANNELS = {'PS3': PS3_AXIS_CHANNELS, 'PS': PS3_AXIS_CHANNELS}
+BUTTON_ACTIONS = {'PS3': PS3_BUTTON_ACTIONS, 'PS': PS3_BUTTON_ACTIONS}
+
+def apply_stick_values(stick_values):
+    """Move servos to the coalesced stick values ({channel: value}) and clear them"""
+    for channel, value in stick_values.items():
+        try:
+            move_servo(channel, value)
+        except Exception as e:
+            main_logger.error("Error moving servo %s: %s", channel, e)
+    stick_values.clear()
+
 def handle_controller_input(gamepad):
     """Process input from game controller"""
-    global servo_speed, q_pressed, exit_flag, lock_state, hold_state
+    global exit_flag
     
-    debug_logger.info(f"Controller connected: {gamepad.name} ({controller_type})")
+    debug_logger.info("Controller connected: %s (%s)", gamepad.name, controller_type)
+    
+    # Select the dispatch tables once for the connected controller
+    axis_index = build_axis_index(AXIS_CHANNELS.get(controller_type, XBOX_AXIS_CHANNELS))
+    button_actions = BUTTON_ACTIONS.get(controller_type, XBOX_BUTTON_ACTIONS)
+    
+    # Imported here rather than at module scope: display imports this module
+    from display import request_redraw
+    
+    # Last stick value written to debug.log, per axis code
+    logged_sticks = {}
     
     try:
-        for event in gamepad.read_loop():
-            # Log all controller events
-            log_controller_event(event.type, event.code, event.value)
+        while not exit_flag:
+            # Sleep until input arrives or stop_controller_input() is called
+            readable, _, _ = select.select([gamepad.fd, exit_wake_r], [], [])
+            if exit_wake_r in readable:
+                try:
+                    os.read(exit_wake_r, 64)
+                except BlockingIOError:
+                    pass
+            if gamepad.fd not in readable:
+                continue
             
-            # Check for exit flag
-            if exit_flag:
-                break
-                
+            # Drain every event queued since the last wake-up in one read
             try:
-                # Handle joystick movements
-                if event.type == ecodes.EV_ABS:
-                    # Left stick
-                    if event.code == 0:  # Left Stick X
-                        move_servo(0, event.value)
-                    elif event.code == 1:  # Left Stick Y
-                        move_servo(1, event.value)
-                    
-                    # Right stick for PS3 controllers
-                    if controller_type == 'PS3' or controller_type == 'PS':
-                        if event.code == 2:  # Right Stick X (Z)
-                            move_servo(2, event.value)
-                        elif event.code == 3:  # Right Stick Y (RX)
-                            move_servo(3, event.value)
-                    else:  # Xbox
-                        if event.code == 5:  # Right Stick X
-                            move_servo(3, event.value)
-                        elif event.code == 4:  # Right Stick Y
-                            move_servo(2, event.value)
+                events = gamepad.read()
+            except BlockingIOError:
+                continue
+            
+            # Stick values are absolute positions, so only the last value of
+            # each stick axis is passed on to its servo - before the next
+            # button press, or at the end of the burst
+            stick_values = {}
+            button_pressed = False
+            
+            for event in events:
+                # Only buttons and axes carry input - sync markers and
+                # EV_MSC scan codes (sent with every button) are dropped
+                if event.type != ecodes.EV_KEY and event.type != ecodes.EV_ABS:
+                    continue
                 
-                # Handle button presses
-                elif event.type == ecodes.EV_KEY and event.value == 1:  # Button pressed
-                    # Handle PS3 controller buttons based on test log
-                    if controller_type == 'PS3' or controller_type == 'PS':
-                        if event.code == 304:  # Cross (✕)
-                            hold_state[0] = not hold_state[0]
-                        elif event.code == 305:  # Circle (○)
-                            hold_state[1] = not hold_state[1]
-                        elif event.code == 308:  # Square (□)
-                            hold_state[2] = not hold_state[2]
-                        elif event.code == 307:  # Triangle (△)
-                            hold_state[3] = not hold_state[3]
-                        elif event.code == 294:  # L1
-                            servo_speed = max(servo_speed - 0.1, 0.1)
-                            print(f"\nSpeed decreased to {servo_speed:.1f}x")
-                        elif event.code == 295:  # R1
-                            servo_speed = min(servo_speed + 0.1, 2.0)
-                            print(f"\nSpeed increased to {servo_speed:.1f}x")
-                        elif event.code == 298:  # L2
-                            move_all_servos(0)
-                        elif event.code == 299:  # R2
-                            move_all_servos(180)
-                        elif event.code == 288:  # Select
-                            # Additional function if needed
-                            pass
-                        elif event.code == 291:  # Start
-                            move_all_servos(90)
-                        elif event.code == 300:  # D-pad Up
-                            move_all_servos(90)
-                        elif event.code == 302:  # D-pad Down
-                            lock_state = not lock_state
-                            status = "LOCKED" if lock_state else "UNLOCKED"
-                            print(f"\nServos now {status}")
-                        elif event.code == 303:  # D-pad Left
-                            move_all_servos(0)
-                        elif event.code == 301:  # D-pad Right
-                            move_all_servos(180)
-                        elif event.code == 292:  # PS Button
-                            if q_pressed:
-                                print("\nPS button pressed twice. Exiting...")
-                                exit_flag = True
-                            else:
-                                q_pressed = True
-                                print("\nPress PS button again to exit...")
-                    else:
-                        # Xbox controller buttons
-                        if event.code == ecodes.BTN_SOUTH:  # A
-                            hold_state[0] = not hold_state[0]
-                        elif event.code == ecodes.BTN_EAST:  # B
-                            hold_state[1] = not hold_state[1]
-                        elif event.code == ecodes.BTN_WEST:  # X
-                            hold_state[2] = not hold_state[2]
-                        elif event.code == ecodes.BTN_NORTH:  # Y
-                            hold_state[3] = not hold_state[3]
-                        elif event.code == ecodes.BTN_TL:  # Left Shoulder
-                            servo_speed = max(servo_speed - 0.1, 0.1)
-                            print(f"\nSpeed decreased to {servo_speed:.1f}x")
-                        elif event.code == ecodes.BTN_TR:  # Right Shoulder
-                            servo_speed = min(servo_speed + 0.1, 2.0)
-                            print(f"\nSpeed increased to {servo_speed:.1f}x")
-                        elif event.code == ecodes.BTN_DPAD_UP:  # Up D-pad
-                            move_all_servos(90)
-                        elif event.code == ecodes.BTN_DPAD_DOWN:  # Down D-pad
-                            lock_state = not lock_state
-                            status = "LOCKED" if lock_state else "UNLOCKED"
-                            print(f"\nServos now {status}")
-                        elif event.code == ecodes.BTN_DPAD_LEFT:  # Left D-pad
-                            move_all_servos(0)
-                        elif event.code == ecodes.BTN_DPAD_RIGHT:  # Right D-pad
-                            move_all_servos(180)
-                        elif event.code == ecodes.KEY_Q:  # Q key for exit
-                            if q_pressed:
-                                print("\nQ pressed twice. Exiting...")
-                                exit_flag = True
-                            else:
-                                q_pressed = True
-                                print("\nPress Q again to exit...")
+                # Servo channel of a stick axis event, -1 for any other event
+                channel = axis_index[event.code] if event.type == ecodes.EV_ABS else -1
                 
-                # Update display
-                from display import update_display
-                update_display()
+                # Log controller events, skipping small stick movements
+                if channel >= 0:
+                    last = logged_sticks.get(event.code)
+                    if last is None or abs(event.value - last) > STICK_LOG_DEADBAND:
+                        logged_sticks[event.code] = event.value
+                        log_controller_event(event.type, event.code, event.value)
+                else:
+                    log_controller_event(event.type, event.code, event.value)
                 
-            except Exception as e:
-                # Log the error but continue processing events
-                main_logger.error(f"Error processing controller event: {e}")
-                debug_logger.error(f"ERROR - {e} - Event: {event}")
+                # Check for exit flag
+                if exit_flag:
+                    break
+                    
+                try:
+                    # Handle joystick movements
+                    if channel >= 0:
+                        stick_values[channel] = event.value
+                    
+                    # Handle button presses
+                    elif event.type == ecodes.EV_KEY and event.value == 1:  # Button pressed
+                        action = button_actions.get(event.code)
+                        if action:
+                            # Earlier stick moves happened first - a hold or
+                            # lock press must not block them
+                            apply_stick_values(stick_values)
+                            action()
+                            button_pressed = True
+                    
+                except Exception as e:
+                    # Log the error but continue processing events
+                    main_logger.error("Error processing controller event: %s", e)
+                    debug_logger.error("ERROR - %s - Event: %s", e, event)
+            
+            apply_stick_values(stick_values)
+            
+            # Redraw once for the whole burst, right away after a button press
+            # so lock, hold and speed changes show without delay. The display
+            # thread does the console write, so a slow terminal can't hold
+            # up input
+            request_redraw(force=button_pressed)
     
     except Exception as e:
-        main_logger.error(f"Controller error: {e}")
+        main_logger.error("Controller error: %s", e)
         print(f"\nController error: {e}")
         exit_flag = True
         
+def stop_controller_input():
+    """Make handle_controller_input return, even while it is waiting for input"""
+    global exit_flag
+    exit_flag = True
+    try:
+        os.write(exit_wake_w, b'\0')
+    except BlockingIOError:
+        pass  # A wake-up is already pending
+
 def list_available_controllers():
     """List all available input devices"""
     print("Available input devices:")
@@ -4,52 +4,149 @@ Database handling for servo controller.
 """
 
 import json
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
 from sqlite3 import Error
 
-from config import DB_PATH
+from config import DB_PATH, LOG_TABLE, LOG_RETENTION_ROWS, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_QUEUE_SIZE
 from logger import main_logger
 from hardware import get_hardware_status
 from controller_input import get_controller_status
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# JSON serialization for the log columns, using orjson when it's installed
+if ORJSON_AVAILABLE:
+    def dumps_text(obj):
+        """Serialize an object to a JSON string"""
+        return orjson.dumps(obj).decode()
+else:
+    def dumps_text(obj):
+        """Serialize an object to a JSON string"""
+        return json.dumps(obj)
+
+# Last hardware_status JSON and the values it was built from - it only
+# changes when a device connects or disconnects
+status_json_cache = (None, None)
+
+# Last servo_data JSON and the dict it was built from - servos sit still
+# between most log entries
+servo_json_cache = (None, None)
+
+# Each thread (log writer, web server workers) keeps one open connection
+connection_local = threading.local()
+
+# Rows queued by log_data() for the background writer
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+log_writer_stop = threading.Event()
+log_writer_handle = None
+
+# Kept as constants so sqlite3's per-connection statement cache reuses one
+# prepared statement for every batch
+INSERT_LOG_SQL = (
+    f"INSERT INTO {LOG_TABLE} (timestamp, servo_data, mpu_data, hardware_status) "
+    "VALUES (?, ?, ?, ?)"
+)
+PRUNE_LOG_SQL = f"DELETE FROM {LOG_TABLE} WHERE id <= (SELECT max(id) FROM {LOG_TABLE}) - ?"
+
+def get_connection(**connect_args):
+    """Open a connection to the log database with the performance PRAGMAs applied"""
+    conn = sqlite3.connect(DB_PATH, **connect_args)
+    cursor = conn.cursor()
+    
+    # Per-connection settings; WAL mode itself is stored in the database
+    # file by setup_database(). With WAL, synchronous=NORMAL means a commit
+    # no longer waits on an fsync
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA cache_size=-20000")
+    
+    return conn
+
+def get_thread_connection():
+    """Get the calling thread's connection to the log database"""
+    conn = getattr(connection_local, 'conn', None)
+    if conn is None:
+        conn = get_connection()
+        connection_local.conn = conn
+    return conn
+
 def setup_database():
     """Initialize the SQLite database and tables"""
     conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection()
         cursor = conn.cursor()
         
-        # Create table for servo logs
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS servo_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
+        # Larger pages mean fewer page writes per logged batch. This only
+        # takes effect when the database file is first created, so it has to
+        # come before the WAL switch
+        cursor.execute("PRAGMA page_size=8192")
+        
+        # Write-ahead logging lets the web server read while rows are
+        # inserted. The mode persists in the file, so it is set once here
+        # rather than on every connection
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        # Create table for servo logs. servo_logs itself belongs to the
+        # columnar schema of servo_controller.py, which uses the same file
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {LOG_TABLE} (
+                id INTEGER PRIMARY KEY,
+                timestamp REAL,
                 servo_data TEXT,
                 mpu_data TEXT,
                 hardware_status TEXT
             )
         ''')
         
+        # Entries written before the split are still in a JSON-format
+        # servo_logs, or in the servo_logs_legacy an earlier servo_controller.py
+        # moved them to - move them over, which also converts their timestamp
+        # column to REAL and drops any AUTOINCREMENT key
+        json_tables = []
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'servo_logs_legacy'")
+        if cursor.fetchone():
+            json_tables.append('servo_logs_legacy')
+        cursor.execute("PRAGMA table_info(servo_logs)")
+        if 'servo_data' in {column[1] for column in cursor.fetchall()}:
+            json_tables.append('servo_logs')
+        for table in json_tables:
+            cursor.execute(
+                f"INSERT INTO {LOG_TABLE} (timestamp, servo_data, mpu_data, hardware_status) "
+                f"SELECT timestamp, servo_data, mpu_data, hardware_status FROM {table} ORDER BY id"
+            )
+            cursor.execute(f"DROP TABLE {table}")
+            main_logger.info("Moved JSON-format log entries from %s to %s", table, LOG_TABLE)
+        
         conn.commit()
-        main_logger.info(f"Database initialized at {DB_PATH}")
+        main_logger.info("Database initialized at %s", DB_PATH)
         return True
     except Error as e:
-        main_logger.error(f"Database error: {e}")
+        main_logger.error("Database error: %s", e)
         return False
     finally:
         if conn:
             conn.close()
 
 def log_data():
-    """Log current data to the database"""
+    """Queue current data to be logged to the database"""
     try:
         # Get current hardware status
         hw_status = get_hardware_status()
         controller_status = get_controller_status()
         
-        # Prepare data for logging
-        timestamp = datetime.now().isoformat()
+        # Prepare data for logging (unix time, converted to ISO format on read)
+        timestamp = time.time()
         
         servo_data = {
             'positions': hw_status['servos']['positions'],
@@ -58,6 +155,53 @@ def log_data():
             'speed': hw_status['servos']['speed']
         }
         
+        # Convert to JSON
+        servo_json = get_servo_json(servo_data)
+        mpu_json = dumps_text(hw_status['mpu']['data'])
+        status_json = get_status_json(hw_status, controller_status)
+        
+        # Hand the row to the log writer thread, or write it right away
+        # when the writer isn't running
+        row = (timestamp, servo_json, mpu_json, status_json)
+        if log_writer_handle is None or not log_writer_handle.is_alive():
+            return write_log_rows([row])
+        try:
+            log_queue.put_nowait(row)
+        except queue.Full:
+            # Writer can't keep up (e.g. stalled SD card) - drop the oldest row
+            try:
+                log_queue.get_nowait()
+            except queue.Empty:
+                pass
+            log_queue.put_nowait(row)
+        
+        return True
+        
+    except Exception as e:
+        main_logger.error("Logging error: %s", e)
+        return False
+
+def get_servo_json(servo_data):
+    """Get the servo_data JSON, reusing the last one if nothing changed"""
+    global servo_json_cache
+    
+    cached_data, servo_json = servo_json_cache
+    if servo_data != cached_data:
+        servo_json = dumps_text(servo_data)
+        servo_json_cache = (servo_data, servo_json)
+    return servo_json
+
+def get_status_json(hw_status, controller_status):
+    """Get the hardware_status JSON, reusing the last one if nothing changed"""
+    global status_json_cache
+    
+    key = (
+        controller_status['connected'], controller_status['type'], controller_status['exit_flag'],
+        hw_status['pca']['connected'], hw_status['pca']['bus'],
+        hw_status['mpu']['connected'], hw_status['mpu']['bus']
+    )
+    cached_key, status_json = status_json_cache
+    if key != cached_key:
         hardware_status = {
             'controller': controller_status,
             'pca9685': hw_status['pca'],
@@ -66,70 +210,171 @@ def log_data():
                 'bus': hw_status['mpu']['bus']
             }
         }
+        status_json = dumps_text(hardware_status)
+        status_json_cache = (key, status_json)
+    return status_json
+
+def write_log_rows(rows):
+    """Insert a batch of log rows in a single transaction, returning True on success"""
+    conn = get_thread_connection()
+    try:
+        # Take the write lock up front so a concurrent writer (e.g. clearing
+        # logs) can't fail the batch halfway through
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(INSERT_LOG_SQL, rows)
+        # Keep the table bounded to the newest LOG_RETENTION_ROWS entries
+        conn.execute(PRUNE_LOG_SQL, (LOG_RETENTION_ROWS,))
+        conn.execute("COMMIT")
+        main_logger.debug("%s log rows written to database", len(rows))
+        return True
+    except Error as e:
+        main_logger.error("Logging error: %s", e)
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        return False
+
+def log_writer_thread():
+    """Thread for writing queued log rows to the database in batches"""
+    # Autocommit connection, write_log_rows() manages its own BEGIN/COMMIT
+    connection_local.conn = get_connection(isolation_level=None)
+    
+    while not log_writer_stop.is_set() or not log_queue.empty():
+        # Wait for the first row of the next batch
+        try:
+            rows = [log_queue.get(timeout=0.5)]
+        except queue.Empty:
+            continue
         
-        # Convert to JSON
-        servo_json = json.dumps(servo_data)
-        mpu_json = json.dumps(hw_status['mpu']['data'])
-        status_json = json.dumps(hardware_status)
+        # Collect more rows until the batch is full or has waited long enough
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while len(rows) < LOG_BATCH_SIZE:
+            if log_writer_stop.is_set():
+                # Shutting down - batch up whatever is already queued without waiting
+                try:
+                    rows.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+                continue
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
         
-        # Store in database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO servo_logs (timestamp, servo_data, mpu_data, hardware_status) VALUES (?, ?, ?, ?)",
-            (timestamp, servo_json, mpu_json, status_json)
-        )
-        conn.commit()
+        write_log_rows(rows)
+    
+    # Closing the last connection checkpoints the WAL back into the database
+    conn = getattr(connection_local, 'conn', None)
+    if conn is not None:
         conn.close()
-        
-        main_logger.debug("Data logged to database")
-        return True
-        
-    except Exception as e:
-        main_logger.error(f"Logging error: {e}")
-        return False
+        connection_local.conn = None
+
+def start_log_writer():
+    """Start the background database log writer"""
+    global log_writer_handle
+    
+    log_writer_stop.clear()
+    log_writer_handle = threading.Thread(target=log_writer_thread)
+    log_writer_handle.daemon = True
+    log_writer_handle.start()
+    return log_writer_handle
+
+def stop_log_writer(timeout=1.0):
+    """Stop the log writer after it has written out any queued rows"""
+    log_writer_stop.set()
+    if log_writer_handle:
+        log_writer_handle.join(timeout=timeout)
+
+def format_timestamp(timestamp):
+    """Convert a stored log timestamp to an ISO 8601 string"""
+    # Rows written before timestamps were stored as REAL already hold ISO
+    # text. A column still declared TEXT stores unix time as text as well
+    if isinstance(timestamp, str):
+        try:
+            timestamp = float(timestamp)
+        except ValueError:
+            return timestamp
+    return datetime.fromtimestamp(timestamp).isoformat()
 
 def get_recent_logs(limit=100):
     """Get the most recent log entries"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = get_thread_connection().cursor()
         
         # Get the most recent log entries
-        cursor.execute("SELECT * FROM servo_logs ORDER BY id DESC LIMIT ?", (limit,))
+        cursor.execute(f"SELECT * FROM {LOG_TABLE} ORDER BY id DESC LIMIT ?", (limit,))
         rows = cursor.fetchall()
         
         logs = []
         for row in rows:
             log_entry = {
                 'id': row[0],
-                'timestamp': row[1],
+                'timestamp': format_timestamp(row[1]),
                 'servo_data': json.loads(row[2]),
                 'mpu_data': json.loads(row[3]),
                 'hardware_status': json.loads(row[4])
             }
             logs.append(log_entry)
         
-        conn.close()
         return logs
     except Exception as e:
-        main_logger.error(f"Error retrieving logs: {e}")
+        main_logger.error("Error retrieving logs: %s", e)
         return []
 
+def get_recent_summaries(limit=100):
+    """Get the id and timestamp of the most recent log entries
+    
+    The JSON columns are never read or parsed, for views that list
+    entries without their data.
+    """
+    try:
+        cursor = get_thread_connection().cursor()
+        cursor.execute(f"SELECT id, timestamp FROM {LOG_TABLE} ORDER BY id DESC LIMIT ?", (limit,))
+        return [
+            {'id': log_id, 'timestamp': format_timestamp(timestamp)}
+            for log_id, timestamp in cursor
+        ]
+    except Exception as e:
+        main_logger.error("Error retrieving log summaries: %s", e)
+        return []
+
+def get_recent_logs_json(limit=100):
+    """Get the most recent log entries as a JSON array string
+    
+    The servo, MPU and hardware columns already hold JSON text, so they are
+    spliced into the response as-is rather than parsed and re-serialized.
+    """
+    try:
+        cursor = get_thread_connection().cursor()
+        
+        cursor.execute(
+            "SELECT id, timestamp, servo_data, mpu_data, hardware_status "
+            f"FROM {LOG_TABLE} ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        entries = [
+            f'{{"id": {log_id}, "timestamp": {json.dumps(format_timestamp(timestamp))}, '
+            f'"servo_data": {servo_json}, "mpu_data": {mpu_json}, "hardware_status": {status_json}}}'
+            for log_id, timestamp, servo_json, mpu_json, status_json in cursor
+        ]
+        
+        return "[" + ", ".join(entries) + "]"
+    except Exception as e:
+        main_logger.error("Error retrieving logs: %s", e)
+        return "[]"
+
 def clear_logs():
     """Clear all logs from the database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM servo_logs")
+        conn = get_thread_connection()
+        conn.execute(f"DELETE FROM {LOG_TABLE}")
         conn.commit()
         
         main_logger.info("All logs cleared from database")
         return True
     except Exception as e:
-        main_logger.error(f"Error clearing logs: {e}")
+        main_logger.error("Error clearing logs: %s", e)
         return False
-    finally:
-        if conn:
-            conn.close()
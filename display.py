@@ -4,47 +4,135 @@ Console display functionality for servo controller.
 """
 
 import sys
-from config import DIRECTION_ARROWS
+import threading
+import time
+from config import DIRECTION_ARROW_BY_CODE, SERVO_CHANNELS
 from hardware import get_hardware_status
 from controller_input import get_controller_status
 
-def get_direction_arrow(direction):
-    """Get arrow character based on direction"""
-    return DIRECTION_ARROWS.get(direction, "○")
+DISPLAY_MIN_INTERVAL = 0.05  # Minimum seconds between unforced redraws (20 Hz)
+last_display = 0.0  # Monotonic time of the last redraw
+last_status_text = None  # Status line currently on the console
 
-def update_display():
-    """Update console display with current status"""
-    # Clear the line (carriage return without newline)
-    sys.stdout.write("\r" + " " * 120 + "\r")
+# Redraws requested by the input loop, carried out by the display thread
+redraw_requested = threading.Event()
+force_requested = False  # Set with redraw_requested for an unthrottled redraw
+display_stop = threading.Event()
+display_thread_handle = None
+
+STATUS_CLEAR = "\r\x1b[K"  # Carriage return, then erase to end of line
+
+# Console status line, built once: per-servo fields followed by MPU and hardware fields
+STATUS_TEMPLATE = (
+    "".join(f"S{ch}:{{}}{{:3}}°{{}} " for ch in SERVO_CHANNELS)
+    + " | Accel: X:{}{:5.1f} Y:{}{:5.1f} Z:{}{:5.1f}"
+    + " | PCA:{}({}) MPU:{}({}) Ctrl:{} Spd:{:.1f}x"
+)
+
+def update_display(force=False):
+    """Update console display with current status
+    
+    Skips the redraw and returns False if the last one was less than
+    DISPLAY_MIN_INTERVAL ago, unless force is set. An unforced redraw of an
+    unchanged status line writes nothing.
+    """
+    global last_display, last_status_text
+    
+    now = time.monotonic()
+    if not force and now - last_display < DISPLAY_MIN_INTERVAL:
+        return False
+    last_display = now
     
     # Get current status
     hw_status = get_hardware_status()
     controller_status = get_controller_status()
     
-    # Hardware status strings
-    pca_status = "CONNECTED" if hw_status['pca']['connected'] else "DISCONNECTED"
-    mpu_status = "CONNECTED" if hw_status['mpu']['connected'] else "DISCONNECTED"
-    ctrl_status = controller_status['type'] if controller_status['connected'] else "DISCONNECTED"
+    servos = hw_status['servos']
+    arrows = DIRECTION_ARROW_BY_CODE
     
     # Servo status
-    servo_text = ""
-    for ch in hw_status['servos']['positions']:
-        arrow = get_direction_arrow(hw_status['servos']['directions'][ch])
-        lock = "L" if hw_status['servos']['hold_state'][ch] else " "
-        servo_text += f"S{ch}:{arrow}{hw_status['servos']['positions'][ch]:3}°{lock} "
+    values = []
+    for ch in SERVO_CHANNELS:
+        values += (
+            arrows[servos['direction_codes'][ch]],
+            servos['positions'][ch],
+            "L" if servos['hold_state'][ch] else " "
+        )
     
     # MPU data
-    mpu_text = ""
-    mpu_data = hw_status['mpu']['data']
-    ax = get_direction_arrow(mpu_data['direction']['x'])
-    ay = get_direction_arrow(mpu_data['direction']['y'])
-    az = get_direction_arrow(mpu_data['direction']['z'])
-    mpu_text = f"Accel: X:{ax}{mpu_data['accel']['x']:5.1f} Y:{ay}{mpu_data['accel']['y']:5.1f} Z:{az}{mpu_data['accel']['z']:5.1f}"
-    
-    # Full hardware status
-    hw_text = f"PCA:{pca_status}({hw_status['pca']['bus']}) MPU:{mpu_status}({hw_status['mpu']['bus']}) Ctrl:{ctrl_status} Spd:{hw_status['servos']['speed']:.1f}x"
-    
-    # Combine all text
-    status_text = f"{servo_text} | {mpu_text} | {hw_text}"
-    sys.stdout.write(status_text)
+    accel = hw_status['mpu']['data']['accel']
+    direction = hw_status['mpu']['direction_codes']
+    values += (
+        arrows[direction[0]], accel['x'],
+        arrows[direction[1]], accel['y'],
+        arrows[direction[2]], accel['z']
+    )
+    
+    # Hardware status
+    values += (
+        "CONNECTED" if hw_status['pca']['connected'] else "DISCONNECTED", hw_status['pca']['bus'],
+        "CONNECTED" if hw_status['mpu']['connected'] else "DISCONNECTED", hw_status['mpu']['bus'],
+        controller_status['type'] if controller_status['connected'] else "DISCONNECTED",
+        servos['speed']
+    )
+    
+    # Skip the terminal write entirely when nothing visible has changed. A
+    # forced redraw always writes, as a message may have been printed since
+    status_text = STATUS_TEMPLATE.format(*values)
+    if status_text == last_status_text and not force:
+        return True
+    last_status_text = status_text
+    
+    # Clear and redraw the line in a single write
+    sys.stdout.write(STATUS_CLEAR + status_text)
     sys.stdout.flush()
+    return True
+
+def request_redraw(force=False):
+    """Ask the display thread for a redraw without waiting on the console
+    
+    Redraws inline when the display thread isn't running.
+    """
+    global force_requested
+    
+    if display_thread_handle is None or not display_thread_handle.is_alive():
+        update_display(force=force)
+        return
+    if force:
+        force_requested = True
+    redraw_requested.set()
+
+def display_thread():
+    """Thread for redrawing the console status line on request"""
+    global force_requested
+    
+    while not display_stop.is_set():
+        redraw_requested.wait()
+        if display_stop.is_set():
+            break
+        redraw_requested.clear()
+        force = force_requested
+        force_requested = False
+        
+        if not update_display(force=force):
+            # Throttled - wait out the rest of the interval, then show the
+            # latest state along with anything requested in the meantime
+            display_stop.wait(last_display + DISPLAY_MIN_INTERVAL - time.monotonic())
+            redraw_requested.set()
+
+def start_display_thread():
+    """Start the background console display thread"""
+    global display_thread_handle
+    
+    display_stop.clear()
+    display_thread_handle = threading.Thread(target=display_thread)
+    display_thread_handle.daemon = True
+    display_thread_handle.start()
+    return display_thread_handle
+
+def stop_display_thread(timeout=1.0):
+    """Stop the console display thread"""
+    display_stop.set()
+    redraw_requested.set()
+    if display_thread_handle:
+        display_thread_handle.join(timeout=timeout)
@@ -3,9 +3,12 @@
 Hardware interface for PCA9685 servo controller and MPU6050 sensor.
 """
 
-import math
+import array
+import threading
 import time
-from config import SERVO_MIN, SERVO_MAX, SERVO_FREQ, I2C_BUSES, SERVO_CHANNELS, DIRECTION_ARROWS
+from math import sin, cos
+from config import SERVO_MIN, SERVO_MAX, SERVO_FREQ, I2C_BUSES, SERVO_CHANNELS, NUM_SERVOS
+from config import DIR_NEUTRAL, DIR_UP, DIR_DOWN, DIR_LEFT, DIR_RIGHT, DIRECTION_NAMES
 from logger import main_logger
 
 # Try to import hardware libraries, but continue if they're not available
@@ -23,6 +26,11 @@ except ImportError:
     print("Warning: MPU6050 library not found. Running in simulation mode.")
     MPU6050_AVAILABLE = False
 
+# PCA9685 registers
+PCA9685_MODE1 = 0x00
+PCA9685_MODE1_AI = 0x20  # Register auto-increment
+PCA9685_LED0_ON_L = 0x06  # Each channel has 4 registers from here
+
 # Global hardware state
 pca_connected = False
 mpu_connected = False
@@ -30,13 +38,36 @@ pca_bus = None
 mpu_bus = None
 pwm = None
 mpu = None
+pca_auto_increment = False
+
+# Direction codes for an increasing/decreasing angle on each channel
+SERVO_DIR_INCREASE = tuple(DIR_UP if ch in (1, 2) else DIR_RIGHT for ch in range(NUM_SERVOS))
+SERVO_DIR_DECREASE = tuple(DIR_DOWN if ch in (1, 2) else DIR_LEFT for ch in range(NUM_SERVOS))
 
-# Servo state
-servo_positions = {0: 90, 1: 90, 2: 90, 3: 90}
-servo_directions = {0: "neutral", 1: "neutral", 2: "neutral", 3: "neutral"}
-hold_state = {0: False, 1: False, 2: False, 3: False}
+# Servo state, indexed by channel
+servo_positions = array.array('B', [90] * NUM_SERVOS)  # Angles 0-180
+servo_directions = array.array('B', [DIR_NEUTRAL] * NUM_SERVOS)  # Direction codes
+hold_state = array.array('B', [0] * NUM_SERVOS)  # 1 if the servo is on hold
+written_pulses = array.array('H', [0] * NUM_SERVOS)  # Last pulses sent to the PCA9685, 0 if off
+pending_pulses = array.array('H', [0] * NUM_SERVOS)  # Joystick targets for the servo output thread, 0 if none
 lock_state = False
 servo_speed = 1.0
+speed_step = 10  # servo_speed in 0.1x steps, so repeated presses don't drift
+MAX_SPEED_STEP = 20  # 2.0x
+SPEED_BY_STEP = tuple(step / 10 for step in range(MAX_SPEED_STEP + 1))  # Exact 0.1x multiples
+
+# Background writer for buffered joystick targets
+servo_output_stop = threading.Event()
+servo_output_handle = None
+
+# Held while pending_pulses/written_pulses are read and the matching pulses
+# written, so the output thread can't send a stale joystick target over a
+# direct command. Reentrant, as the batch writers call set_pwms() with it held
+servo_lock = threading.RLock()
+
+# Last get_hardware_status() result, shared by callers within STATUS_SNAPSHOT_TTL
+STATUS_SNAPSHOT_TTL = 0.01  # Seconds
+status_snapshot = (0.0, None)  # (monotonic expiry time, status dict)
 
 # MPU data
 mpu_data = {
@@ -45,10 +76,11 @@ mpu_data = {
     'temp': 0,
     'direction': {'x': "neutral", 'y': "neutral", 'z': "neutral"}
 }
+mpu_direction_codes = array.array('B', [DIR_NEUTRAL] * 3)  # X, Y, Z codes behind mpu_data['direction']
 
 def detect_i2c_devices():
     """Detect available I2C devices and initialize hardware"""
-    global pca_connected, mpu_connected, pca_bus, mpu_bus, pwm, mpu
+    global pca_connected, mpu_connected, pca_bus, mpu_bus, pwm, mpu, pca_auto_increment
     
     # Check each I2C bus
     for bus_num in I2C_BUSES:
@@ -65,6 +97,16 @@ def detect_i2c_devices():
             except Exception as e:
                 print(f"PCA9685 not found on I2C bus {bus_num}: {e}")
                 main_logger.warning(f"PCA9685 not found on I2C bus {bus_num}: {e}")
+            
+            # Enable register auto-increment so several channels can be
+            # written in a single I2C transaction
+            if pca_connected:
+                try:
+                    mode1 = pwm._device.readU8(PCA9685_MODE1)
+                    pwm._device.write8(PCA9685_MODE1, (mode1 & 0x7F) | PCA9685_MODE1_AI)
+                    pca_auto_increment = True
+                except Exception as e:
+                    main_logger.warning(f"PCA9685 auto-increment unavailable, using per-channel writes: {e}")
         
         # Try to initialize MPU6050 on this bus
         if MPU6050_AVAILABLE and not mpu_connected:
@@ -92,56 +134,140 @@ def detect_i2c_devices():
     
     return pca_connected, mpu_connected
 
+def _joystick_angle(value):
+    """Compute the servo angle (0-180) for a joystick value"""
+    return int(((value + 32767) / 65534) * 180)  # Normalize to 0-180 degrees
+
+def _angle_pulse(angle):
+    """Compute the PWM pulse length for an angle (0-180)"""
+    return int(SERVO_MIN + (angle / 180.0) * (SERVO_MAX - SERVO_MIN))
+
+# Lookup tables covering the full signed 16-bit joystick range, indexed by
+# value + JOYSTICK_OFFSET, so joystick events need no floating point math
+JOYSTICK_OFFSET = 32768
+JOYSTICK_LUT_LAST = 65535  # Highest table index; values past either end are clamped to it or 0
+JOYSTICK_ANGLE_LUT = array.array('B', [_joystick_angle(v - JOYSTICK_OFFSET) for v in range(65536)])
+ANGLE_PULSE_LUT = array.array('H', [_angle_pulse(angle) for angle in range(181)])
+
 def joystick_to_angle(value):
     """Convert joystick value (-32767 to 32767) to angle (0-180)"""
-    angle = int(((value + 32767) / 65534) * 180)  # Normalize to 0-180 degrees
-    return angle
+    i = value + JOYSTICK_OFFSET
+    if i < 0:
+        i = 0
+    elif i > JOYSTICK_LUT_LAST:
+        i = JOYSTICK_LUT_LAST
+    return JOYSTICK_ANGLE_LUT[i]
 
 def angle_to_pwm(angle):
     """Convert angle (0-180) to PWM pulse length"""
     # Constrain the angle
-    angle = max(0, min(180, angle))
+    if angle < 0:
+        angle = 0
+    elif angle > 180:
+        angle = 180
     
-    # Calculate pulse length
-    pulse = int(SERVO_MIN + (angle / 180.0) * (SERVO_MAX - SERVO_MIN))
-    return pulse
+    return ANGLE_PULSE_LUT[angle]
 
-def set_servo_position(channel, angle):
-    """Set a servo to a specific angle (0-180)"""
-    global servo_positions, servo_directions
-    
-    if channel not in SERVO_CHANNELS:
-        return False
-    
+def update_servo_state(channel, angle):
+    """Record a new servo angle and direction, returning its pulse length"""
     # Update direction
-    if angle > servo_positions[channel]:
-        servo_directions[channel] = "up" if channel in [1, 2] else "right"
-    elif angle < servo_positions[channel]:
-        servo_directions[channel] = "down" if channel in [1, 2] else "left"
+    previous = servo_positions[channel]
+    if angle > previous:
+        servo_directions[channel] = SERVO_DIR_INCREASE[channel]
+    elif angle < previous:
+        servo_directions[channel] = SERVO_DIR_DECREASE[channel]
     else:
-        servo_directions[channel] = "neutral"
+        servo_directions[channel] = DIR_NEUTRAL
     
     # Constrain the angle
-    angle = max(0, min(180, angle))
-    
-    # Calculate and set the pulse
-    pulse = angle_to_pwm(angle)
-    
-    # Set the pulse
-    if pca_connected and pwm:
-        try:
-            pwm.set_pwm(channel, 0, pulse)
-        except Exception as e:
-            main_logger.error(f"Error setting servo {channel}: {e}")
+    if angle < 0:
+        angle = 0
+    elif angle > 180:
+        angle = 180
     
     # Update position
     servo_positions[channel] = angle
+    invalidate_hardware_status()
+    
+    # Look up pulse length
+    return ANGLE_PULSE_LUT[angle]
+
+def set_servo_position(channel, angle, buffered=False):
+    """Set a servo to a specific angle (0-180)
+    
+    With buffered=True the pulse is left for the servo output thread to write
+    """
+    if channel not in SERVO_CHANNELS:
+        return False
+    
+    with servo_lock:
+        pulse = update_servo_state(channel, angle)
+        
+        if buffered:
+            pending_pulses[channel] = pulse
+            return True
+        
+        # A direct command supersedes any buffered joystick target
+        pending_pulses[channel] = 0
+        
+        # Set the pulse, unless the servo is already there
+        if pca_connected and pwm and pulse != written_pulses[channel]:
+            try:
+                pwm.set_pwm(channel, 0, pulse)
+                written_pulses[channel] = pulse
+            except Exception as e:
+                main_logger.error(f"Error setting servo {channel}: {e}")
+        
     return True
 
+def set_pwms(pulses):
+    """Write pulse lengths for several channels ({channel: pulse}) to the PCA9685
+    
+    Uses the PCA9685 register auto-increment to update every channel in one
+    I2C transaction. Channels in the written range that aren't being changed
+    are rewritten with their last pulse; if a channel has never been written
+    (or is off) the channels are written one at a time instead.
+    """
+    with servo_lock:
+        if not (pca_connected and pwm):
+            return
+        
+        # Skip channels that already have the requested pulse
+        pulses = {channel: pulse for channel, pulse in pulses.items() if pulse != written_pulses[channel]}
+        if not pulses:
+            return
+        
+        first = min(pulses)
+        last = max(pulses)
+        payload = None
+        if pca_auto_increment:
+            payload = []
+            for channel in range(first, last + 1):
+                pulse = pulses.get(channel, written_pulses[channel])
+                if not pulse:
+                    payload = None
+                    break
+                # LEDn_ON_L, LEDn_ON_H, LEDn_OFF_L, LEDn_OFF_H
+                payload += (0, 0, pulse & 0xFF, pulse >> 8)
+        
+        if payload is not None:
+            try:
+                pwm._device.writeList(PCA9685_LED0_ON_L + 4 * first, payload)
+                for channel, pulse in pulses.items():
+                    written_pulses[channel] = pulse
+            except Exception as e:
+                main_logger.error(f"Error setting servos {sorted(pulses)}: {e}")
+            return
+        
+        for channel, pulse in pulses.items():
+            try:
+                pwm.set_pwm(channel, 0, pulse)
+                written_pulses[channel] = pulse
+            except Exception as e:
+                main_logger.error(f"Error setting servo {channel}: {e}")
+
 def move_servo(channel, value):
     """Move a servo based on joystick input"""
-    global servo_positions, servo_directions
-    
     if lock_state or hold_state[channel]:
         return  # Don't move if locked or held
     
@@ -149,38 +275,147 @@ def move_servo(channel, value):
     old_position = servo_positions[channel]
     
     # Convert joystick value to servo position
-    angle = joystick_to_angle(value)
+    # (some generic pads report 0..65535, so clamp to the table's range)
+    i = value + JOYSTICK_OFFSET
+    if i < 0:
+        i = 0
+    elif i > JOYSTICK_LUT_LAST:
+        i = JOYSTICK_LUT_LAST
+    angle = JOYSTICK_ANGLE_LUT[i]
     
-    # Set servo position
-    set_servo_position(channel, angle)
+    # Most stick events don't change the whole-degree angle - just mark the
+    # servo as settled, with nothing to write
+    if angle == old_position:
+        if servo_directions[channel] != DIR_NEUTRAL:
+            servo_directions[channel] = DIR_NEUTRAL
+            invalidate_hardware_status()
+        return old_position, angle
+    
+    # Set servo position, leaving the I2C write to the servo output thread
+    # when it is running
+    buffered = servo_output_handle is not None and servo_output_handle.is_alive()
+    set_servo_position(channel, angle, buffered=buffered)
     
     # Return old and new positions for logging
     return old_position, angle
 
 def move_all_servos(angle):
     """Move all servos to a specified angle"""
-    global servo_positions
-    
     if lock_state:
         return  # Don't move if locked
     
     # Store results for logging
     results = {}
     
-    # Move each servo that isn't on hold
-    for channel in SERVO_CHANNELS:
-        if not hold_state[channel]:
-            old_position = servo_positions[channel]
-            set_servo_position(channel, angle)
-            results[channel] = (old_position, angle)
+    with servo_lock:
+        # Move each servo that isn't on hold
+        pulses = {}
+        for channel in SERVO_CHANNELS:
+            if not hold_state[channel]:
+                old_position = servo_positions[channel]
+                pulses[channel] = update_servo_state(channel, angle)
+                pending_pulses[channel] = 0
+                results[channel] = (old_position, angle)
+        
+        # Write every moved channel together
+        set_pwms(pulses)
     
     return results
 
+def servo_output_thread():
+    """Thread for writing buffered joystick targets to the servos once per PWM period"""
+    period = 1.0 / SERVO_FREQ
+    deadline = time.monotonic()
+    
+    while not servo_output_stop.is_set():
+        with servo_lock:
+            # Only the latest target per channel matters - the servo can't follow
+            # changes faster than its PWM period anyway
+            pulses = {}
+            for channel in SERVO_CHANNELS:
+                pulse = pending_pulses[channel]
+                if pulse and pulse != written_pulses[channel]:
+                    pulses[channel] = pulse
+            
+            # Send every channel that moved this cycle in one I2C transaction
+            if pulses:
+                set_pwms(pulses)
+            
+        deadline += period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            servo_output_stop.wait(delay)
+        else:
+            # Fell behind (e.g. slow I2C bus), restart the schedule from now
+            deadline = time.monotonic()
+
+def start_servo_output():
+    """Start the background servo output thread"""
+    global servo_output_handle
+    
+    servo_output_stop.clear()
+    servo_output_handle = threading.Thread(target=servo_output_thread)
+    servo_output_handle.daemon = True
+    servo_output_handle.start()
+    return servo_output_handle
+
+def stop_servo_output(timeout=1.0):
+    """Stop the servo output thread, so it no longer writes to the servos"""
+    servo_output_stop.set()
+    if servo_output_handle:
+        servo_output_handle.join(timeout=timeout)
+
+def set_lock_state(locked):
+    """Lock (True) or unlock (False) all servos"""
+    global lock_state
+    lock_state = bool(locked)
+    invalidate_hardware_status()
+    return lock_state
+
+def toggle_lock_state():
+    """Toggle the global servo lock, returning the new state"""
+    return set_lock_state(not lock_state)
+
+def adjust_servo_speed(steps):
+    """Change the servo speed multiplier by whole 0.1x steps within 0.1x-2.0x,
+    returning the new speed"""
+    global servo_speed, speed_step
+    speed_step = min(max(speed_step + steps, 1), MAX_SPEED_STEP)
+    servo_speed = SPEED_BY_STEP[speed_step]
+    invalidate_hardware_status()
+    return servo_speed
+
 def stop_all_servos():
     """Stop all servos (turn off PWM)"""
-    if pca_connected and pwm:
-        pwm.set_all_pwm(0, 0)
-        main_logger.info("All servos stopped")
+    with servo_lock:
+        # Drop buffered joystick targets, so the output thread can't restart a servo
+        for channel in SERVO_CHANNELS:
+            pending_pulses[channel] = 0
+        
+        if pca_connected and pwm:
+            pwm.set_all_pwm(0, 0)
+            for channel in SERVO_CHANNELS:
+                written_pulses[channel] = 0
+            main_logger.info("All servos stopped")
+
+# MPU direction codes indexed by (value > threshold) - (value < -threshold) + 1
+MPU_X_DIRECTIONS = (DIR_LEFT, DIR_NEUTRAL, DIR_RIGHT)
+MPU_YZ_DIRECTIONS = (DIR_DOWN, DIR_NEUTRAL, DIR_UP)
+
+def set_mpu_directions(threshold):
+    """Set the MPU direction indicators from the current acceleration"""
+    accel = mpu_data['accel']
+    direction = mpu_data['direction']
+    x = accel['x']
+    y = accel['y']
+    z = accel['z']
+    codes = mpu_direction_codes
+    codes[0] = MPU_X_DIRECTIONS[(x > threshold) - (x < -threshold) + 1]
+    codes[1] = MPU_YZ_DIRECTIONS[(y > threshold) - (y < -threshold) + 1]
+    codes[2] = MPU_YZ_DIRECTIONS[(z > 9.8 + threshold) - (z < 9.8 - threshold) + 1]  # Z rests at 1g
+    direction['x'] = DIRECTION_NAMES[codes[0]]
+    direction['y'] = DIRECTION_NAMES[codes[1]]
+    direction['z'] = DIRECTION_NAMES[codes[2]]
 
 def update_mpu_data():
     """Update MPU6050 sensor data"""
@@ -204,36 +439,51 @@ def update_mpu_data():
             mpu_data['temp'] = mpu.get_temp()
             
             # Determine direction for visualization
-            threshold = 0.5  # Threshold for considering movement
-            mpu_data['direction']['x'] = "right" if accel_data['x'] > threshold else "left" if accel_data['x'] < -threshold else "neutral"
-            mpu_data['direction']['y'] = "up" if accel_data['y'] > threshold else "down" if accel_data['y'] < -threshold else "neutral"
-            mpu_data['direction']['z'] = "up" if accel_data['z'] > 9.8 + threshold else "down" if accel_data['z'] < 9.8 - threshold else "neutral"
+            set_mpu_directions(0.5)  # Threshold for considering movement
             
         except Exception as e:
             main_logger.error(f"Error reading MPU data: {e}")
     else:
-        # Simulation mode - generate some fake data
-        mpu_data['accel']['x'] = math.sin(time.time() * 0.5) * 0.5
-        mpu_data['accel']['y'] = math.cos(time.time() * 0.7) * 0.5
-        mpu_data['accel']['z'] = 9.8 + math.sin(time.time() * 0.3) * 0.2
+        # Simulation mode - generate some fake data from a single timestamp
+        t = time.time()
+        accel = mpu_data['accel']
+        gyro = mpu_data['gyro']
+        accel['x'] = sin(t * 0.5) * 0.5
+        accel['y'] = cos(t * 0.7) * 0.5
+        accel['z'] = 9.8 + sin(t * 0.3) * 0.2
         
-        mpu_data['gyro']['x'] = math.sin(time.time() * 0.2) * 2
-        mpu_data['gyro']['y'] = math.cos(time.time() * 0.4) * 2
-        mpu_data['gyro']['z'] = math.sin(time.time() * 0.6) * 2
+        gyro['x'] = sin(t * 0.2) * 2
+        gyro['y'] = cos(t * 0.4) * 2
+        gyro['z'] = sin(t * 0.6) * 2
         
-        mpu_data['temp'] = 25 + math.sin(time.time() * 0.1) * 0.5
+        mpu_data['temp'] = 25 + sin(t * 0.1) * 0.5
         
         # Determine direction for visualization
-        threshold = 0.3
-        mpu_data['direction']['x'] = "right" if mpu_data['accel']['x'] > threshold else "left" if mpu_data['accel']['x'] < -threshold else "neutral"
-        mpu_data['direction']['y'] = "up" if mpu_data['accel']['y'] > threshold else "down" if mpu_data['accel']['y'] < -threshold else "neutral"
-        mpu_data['direction']['z'] = "up" if mpu_data['accel']['z'] > 9.8 + threshold else "down" if mpu_data['accel']['z'] < 9.8 - threshold else "neutral"
+        set_mpu_directions(0.3)
     
     return mpu_data
 
+def invalidate_hardware_status():
+    """Make the next get_hardware_status() call build a fresh snapshot"""
+    global status_snapshot
+    status_snapshot = (0.0, None)
+
 def get_hardware_status():
-    """Get current hardware status"""
-    return {
+    """Get current hardware status
+    
+    Callers within STATUS_SNAPSHOT_TTL of each other share one snapshot,
+    which must be treated as read-only. Code that changes servo state
+    calls invalidate_hardware_status(). MPU readings are not copied, so
+    they are always current.
+    """
+    global status_snapshot
+    
+    now = time.monotonic()
+    expires, status = status_snapshot
+    if status is not None and now < expires:
+        return status
+    
+    status = {
         'pca': {
             'connected': pca_connected,
             'bus': pca_bus
@@ -241,13 +491,17 @@ def get_hardware_status():
         'mpu': {
             'connected': mpu_connected,
             'bus': mpu_bus,
-            'data': mpu_data
+            'data': mpu_data,
+            'direction_codes': mpu_direction_codes
         },
         'servos': {
-            'positions': servo_positions,
-            'directions': servo_directions,
-            'hold_state': hold_state,
+            'positions': servo_positions.tolist(),
+            'directions': [DIRECTION_NAMES[code] for code in servo_directions],
+            'direction_codes': servo_directions.tolist(),
+            'hold_state': [bool(held) for held in hold_state],
             'lock_state': lock_state,
             'speed': servo_speed
         }
     }
+    status_snapshot = (now + STATUS_SNAPSHOT_TTL, status)
+    return status
@@ -3,13 +3,24 @@
 Logging setup for the servo controller.
 """
 
+import atexit
 import logging
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
 # Initialize loggers
 main_logger = None
 debug_logger = None
 test_logger = None
+debug_log_listener = None
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread"""
+    
+    def prepare(self, record):
+        # Log arguments are plain values, so the record can be queued as-is
+        return record
 
 def setup_logging():
     """Set up the main application logger"""
@@ -32,12 +43,20 @@ def setup_logging():
     return main_logger
 
 def setup_debug_logging():
-    """Set up a dedicated debug logger for controller inputs"""
-    global debug_logger
+    """Set up a dedicated debug logger for controller inputs
+    
+    Records are written to debug.log by a background QueueListener, so
+    logging from the controller loop doesn't wait on file I/O.
+    """
+    global debug_logger, debug_log_listener
     
     debug_logger = logging.getLogger('controller_debug')
     debug_logger.setLevel(logging.DEBUG)
     
+    # Keep records away from the root logger, whose handlers (if anything
+    # configures them) would write on the controller thread
+    debug_logger.propagate = False
+    
     # Create file handler for debug.log
     debug_file = logging.FileHandler('debug.log')
     debug_file.setLevel(logging.DEBUG)
@@ -46,8 +65,14 @@ def setup_debug_logging():
     formatter = logging.Formatter('%(asctime)s - %(message)s')
     debug_file.setFormatter(formatter)
     
-    # Add handler to logger
-    debug_logger.addHandler(debug_file)
+    # Add handler to logger through a queue drained by the listener thread
+    debug_queue = queue.SimpleQueue()
+    debug_logger.addHandler(DeferredQueueHandler(debug_queue))
+    debug_log_listener = QueueListener(debug_queue, debug_file)
+    debug_log_listener.start()
+    
+    # Write out any queued records when the program exits
+    atexit.register(debug_log_listener.stop)
     
     return debug_logger
 
@@ -7,12 +7,17 @@ import time
 import threading
 import os
 import argparse
+import array
+import select
+import struct
 import evdev
 from evdev import InputDevice, ecodes
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 import logging
-from datetime import datetime
-import math
+from logging.handlers import QueueHandler, QueueListener
+from functools import partial
+from math import sin, cos
+import queue
 import sqlite3
 from sqlite3 import Error
 
@@ -35,6 +40,29 @@ except ImportError:
     print("Warning: MPU6050 library not found. Running in simulation mode.")
     MPU6050_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from waitress import serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    print("Warning: waitress not found. Using the Flask development server.")
+    WAITRESS_AVAILABLE = False
+
+# JSON serialization, using orjson when it's installed
+if ORJSON_AVAILABLE:
+    def dumps_bytes(obj):
+        """Serialize an object to JSON bytes"""
+        return orjson.dumps(obj)
+else:
+    def dumps_bytes(obj):
+        """Serialize an object to JSON bytes"""
+        return json.dumps(obj).encode()
+
 # Configuration Constants
 SERVO_MIN = 150  # Min pulse length (0 degrees)
 SERVO_MAX = 600  # Max pulse length (180 degrees)
@@ -42,17 +70,58 @@ SERVO_FREQ = 50  # PWM frequency for servos (50Hz standard)
 SERVO_CHANNELS = [0, 1, 2, 3]  # Servo channels to control
 I2C_BUSES = [0, 1]  # I2C buses to check
 
+# Servo speed multiplier, adjustable in 0.1x steps from 0.1x to 2.0x
+MAX_SPEED_STEP = 20  # 2.0x
+SPEED_BY_STEP = tuple(step / 10 for step in range(MAX_SPEED_STEP + 1))  # Exact 0.1x multiples
+
+# PCA9685 registers used for multi-channel burst writes
+PCA9685_MODE1 = 0x00
+PCA9685_MODE1_AI = 0x20  # Register auto-increment
+PCA9685_LED0_ON_L = 0x06  # Each channel has 4 registers from here
+
+# MPU6050 registers and scale factors for burst reads
+# (accel reported in m/s^2 like mpu6050.get_accel_data())
+MPU6050_ACCEL_XOUT_H = 0x3B  # Accel XYZ, temp, gyro XYZ as 7 big-endian int16s
+MPU6050_GRAVITY = 9.80665
+MPU6050_ACCEL_LSB = {2: 16384.0, 4: 8192.0, 8: 4096.0, 16: 2048.0}  # LSB per g by range
+MPU6050_GYRO_LSB = {250: 131.0, 500: 65.5, 1000: 32.8, 2000: 16.4}  # LSB per deg/s by range
+
+# Servo direction codes, indexing DIRECTION_NAMES and DIRECTION_ARROW_BY_CODE
+DIR_NEUTRAL = 0
+DIR_UP = 1
+DIR_DOWN = 2
+DIR_LEFT = 3
+DIR_RIGHT = 4
+DIRECTION_NAMES = ("neutral", "up", "down", "left", "right")
+DIRECTION_ARROW_BY_CODE = ("○", "↑", "↓", "←", "→")
+
+# Direction codes for an increasing/decreasing angle on each channel
+NUM_SERVOS = max(SERVO_CHANNELS) + 1
+SERVO_DIR_INCREASE = tuple(DIR_UP if ch in (1, 2) else DIR_RIGHT for ch in range(NUM_SERVOS))
+SERVO_DIR_DECREASE = tuple(DIR_DOWN if ch in (1, 2) else DIR_LEFT for ch in range(NUM_SERVOS))
+
 # Global variables
-hold_state = {0: False, 1: False, 2: False, 3: False}
+# Per-channel servo state is kept in flat arrays indexed by channel number
+hold_state = array.array('B', [0] * NUM_SERVOS)  # 1 if the servo is on hold
 lock_state = False  # Global lock for all servos
-servo_positions = {0: 90, 1: 90, 2: 90, 3: 90}
-servo_directions = {0: "neutral", 1: "neutral", 2: "neutral", 3: "neutral"}
+servo_positions = array.array('B', [90] * NUM_SERVOS)
+servo_directions = [DIR_NEUTRAL] * NUM_SERVOS
 servo_speed = 1.0
+speed_step = 10  # servo_speed in 0.1x steps, so repeated presses don't drift
+written_pulses = array.array('H', [0] * NUM_SERVOS)  # Last pulses sent to the PCA9685, 0 if unknown
+pending_pulses = array.array('H', [0] * NUM_SERVOS)  # Buffered joystick targets, 0 if none
+# Held while pending_pulses/written_pulses are read and the matching pulses
+# written, so the output thread can't send a stale joystick target over a
+# direct command. Reentrant, as the batch writers call set_pwms() with it held
+servo_lock = threading.RLock()
 controller_type = None
 controller_connected = False
 pca_connected = False
 mpu_connected = False
 pca_bus = None
+pca_auto_increment = False  # MODE1 auto-increment enabled for burst writes
+mpu_accel_scale = MPU6050_GRAVITY / MPU6050_ACCEL_LSB[2]  # Raw reading -> m/s^2
+mpu_gyro_scale = 1 / MPU6050_GYRO_LSB[250]  # Raw reading -> deg/s
 mpu_bus = None
 mpu_data = {
     'accel': {'x': 0, 'y': 0, 'z': 0},
@@ -60,13 +129,83 @@ mpu_data = {
     'temp': 0,
     'direction': {'x': "neutral", 'y': "neutral", 'z': "neutral"}
 }
+mpu_direction_codes = [DIR_NEUTRAL] * 3  # X, Y, Z codes behind mpu_data['direction']
 app = Flask(__name__)
 pwm = None
 mpu = None
 q_pressed = False
-exit_flag = False
+exit_event = threading.Event()  # Set to shut down all threads
+display_dirty = threading.Event()  # Set when controller input may have changed the display
+
+# Written by request_shutdown() to wake the controller loop at once
+exit_wake_r, exit_wake_w = os.pipe()
+os.set_blocking(exit_wake_r, False)
+os.set_blocking(exit_wake_w, False)
 db_path = 'servo_data.db'
 
+# Sensor/display update rate
+UPDATE_INTERVAL = 0.1  # Seconds between sensor/display updates
+DISPLAY_MIN_INTERVAL = 0.05  # Minimum seconds between input-triggered redraws
+STICK_LOG_DEADBAND = 2000  # Stick moves smaller than this aren't written to debug.log
+
+# Background database logging
+LOG_INTERVAL = 5.0  # Seconds between servo log entries
+LOG_BATCH_SIZE = 500  # Max rows written per transaction
+LOG_FLUSH_INTERVAL = 0.2  # Max seconds a row waits before being written
+LOG_QUEUE_SIZE = 4096  # Oldest rows are dropped beyond this backlog
+LOG_RETENTION_ROWS = 100000  # Only the newest rows are kept in servo_logs
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+JSON_LOG_TABLE = 'servo_log_entries'  # JSON-format log table, shared with database.py
+
+# servo_logs columns after the id, in the order log_data builds its rows.
+# holds has bit n set for a held servo n, hw_flags holds HW_FLAG_* bits,
+# d<n> and mpu_dir_* hold DIR_* codes
+LOG_COLUMNS = (
+    [("timestamp", "REAL")]
+    + [(f"s{ch}", "INTEGER") for ch in SERVO_CHANNELS]
+    + [("holds", "INTEGER"),
+       ("accel_x", "REAL"), ("accel_y", "REAL"), ("accel_z", "REAL"),
+       ("gyro_x", "REAL"), ("gyro_y", "REAL"), ("gyro_z", "REAL"),
+       ("temp", "REAL"), ("speed", "REAL"), ("hw_flags", "INTEGER")]
+    + [(f"d{ch}", "INTEGER") for ch in SERVO_CHANNELS]
+    + [("mpu_dir_x", "INTEGER"), ("mpu_dir_y", "INTEGER"), ("mpu_dir_z", "INTEGER"),
+       ("controller_type", "TEXT"), ("pca_bus", "INTEGER"), ("mpu_bus", "INTEGER")]
+)
+LOG_COLUMN_NAMES = ", ".join(name for name, _ in LOG_COLUMNS)
+
+# Kept as a single constant so sqlite3's per-connection statement cache
+# reuses one prepared statement for every batch
+INSERT_LOG_SQL = (
+    f"INSERT INTO servo_logs ({LOG_COLUMN_NAMES}) "
+    f"VALUES ({', '.join('?' * len(LOG_COLUMNS))})"
+)
+
+# id is the rowid, so this is a range delete on the table b-tree and costs
+# next to nothing when there is nothing to prune
+PRUNE_LOG_SQL = "DELETE FROM servo_logs WHERE id <= (SELECT max(id) FROM servo_logs) - ?"
+
+# Per-servo min/max/mean over the newest log rows, computed by SQLite
+POSITION_STATS_SQL = (
+    "SELECT count(*), "
+    + ", ".join(f"min(s{ch}), max(s{ch}), avg(s{ch})" for ch in SERVO_CHANNELS)
+    + " FROM (SELECT * FROM servo_logs ORDER BY id DESC LIMIT ?)"
+)
+
+# Bits of the servo_logs hw_flags column
+HW_FLAG_PCA9685 = 0x01
+HW_FLAG_MPU6050 = 0x02
+HW_FLAG_CONTROLLER = 0x04
+log_conn = None
+log_writer_handle = None
+update_thread_handle = None
+servo_output_handle = None
+reader_local = threading.local()  # Per-thread read connections for the web server
+
+# /api/status response body, serialized at most once per update tick and
+# only when requested
+status_tick = 0  # Bumped by the update thread every tick
+status_cache = (-1, None)  # (status_tick it was built for, JSON bytes)
+
 # Corrected PS3 controller button mappings based on config_debug.log
 PS3_BUTTON_MAPPINGS = {
     # Face buttons
@@ -104,79 +243,59 @@ PS3_AXIS_MAPPINGS = {
     3: "Right Stick Y (PS3-RX)"  # Right stick vertical
 }
 
-def handle_ps3_controller(event):
-    """Handle PS3 controller button presses and joystick movements"""
-    global hold_state, servo_speed, q_pressed, exit_flag, lock_state
-
-    # Handle button presses
-    if event.type == ecodes.EV_KEY and event.value == 1:  # Button pressed
-        if event.code == 304:  # Cross (✕)
-            hold_state[0] = not hold_state[0]
-            debug_logger.info(f"Hold state for servo 0 set to {hold_state[0]}")
-        elif event.code == 305:  # Circle (○)
-            hold_state[1] = not hold_state[1]
-            debug_logger.info(f"Hold state for servo 1 set to {hold_state[1]}")
-        elif event.code == 308:  # Square (□)
-            hold_state[2] = not hold_state[2]
-            debug_logger.info(f"Hold state for servo 2 set to {hold_state[2]}")
-        elif event.code == 307:  # Triangle (△)
-            hold_state[3] = not hold_state[3]
-            debug_logger.info(f"Hold state for servo 3 set to {hold_state[3]}")
-        elif event.code == 294:  # L1
-            servo_speed = max(servo_speed - 0.1, 0.1)
-            print(f"\nSpeed decreased to {servo_speed:.1f}x")
-        elif event.code == 295:  # R1
-            servo_speed = min(servo_speed + 0.1, 2.0)
-            print(f"\nSpeed increased to {servo_speed:.1f}x")
-        elif event.code == 298:  # L2
-            move_all_servos(0)
-        elif event.code == 299:  # R2
-            move_all_servos(180)
-        elif event.code == 300:  # D-pad Up
-            move_all_servos(90)
-        elif event.code == 302:  # D-pad Down
-            lock_state = not lock_state
-            status = "LOCKED" if lock_state else "UNLOCKED"
-            print(f"\nServos now {status}")
-        elif event.code == 303:  # D-pad Left
-            move_all_servos(0)
-        elif event.code == 301:  # D-pad Right
-            move_all_servos(180)
-        elif event.code == 288:  # Select
-            # Additional function if needed
-            pass
-        elif event.code == 291:  # Start
-            move_all_servos(90)
-        elif event.code == 292:  # PS Button
-            if q_pressed:
-                print("\nPS button pressed twice. Exiting...")
-                exit_flag = True
-            else:
-                q_pressed = True
-                print("\nPress PS button again to exit...")
-                # Reset q_pressed after 3 seconds
-                threading.Timer(3.0, lambda: setattr(sys.modules[__name__], 'q_pressed', False)).start()
-
-    # Handle joystick movements
-    elif event.type == ecodes.EV_ABS:
-        # Left stick
-        if event.code == 0:  # Left Stick X
-            move_servo(0, event.value)
-        elif event.code == 1:  # Left Stick Y
-            move_servo(1, event.value)
-        # Right stick for PS3 controllers
-        elif event.code == 2:  # Right Stick X (Z)
-            move_servo(2, event.value)
-        elif event.code == 3:  # Right Stick Y (RX)
-            move_servo(3, event.value)
+# Xbox button names using standard ecodes
+XBOX_BUTTON_NAMES = {
+    ecodes.BTN_SOUTH: "A",
+    ecodes.BTN_EAST: "B",
+    ecodes.BTN_WEST: "X",
+    ecodes.BTN_NORTH: "Y",
+    ecodes.BTN_TL: "Left Shoulder",
+    ecodes.BTN_TR: "Right Shoulder",
+    ecodes.BTN_SELECT: "Select/Back",
+    ecodes.BTN_START: "Start",
+    ecodes.BTN_MODE: "Xbox Button",
+    ecodes.BTN_THUMBL: "Left Thumb",
+    ecodes.BTN_THUMBR: "Right Thumb",
+}
+
+# Button names by controller type, anything else uses the Xbox names
+BUTTON_NAMES = {'PS3': PS3_BUTTON_MAPPINGS}
+
+# Axis names for logging, covering both PS3 and Xbox layouts
+AXIS_NAMES = {
+    0: "Left Stick X",
+    1: "Left Stick Y",
+    2: "Right Stick X (PS3-Z)",
+    3: "Right Stick Y (PS3-RX)",
+    4: "Right Stick Y (Xbox)",
+    5: "Right Stick X (Xbox)",
+    16: "D-pad X",
+    17: "D-pad Y",
+}
 
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread"""
+    
+    def prepare(self, record):
+        # Log arguments are plain values, so the record can be queued as-is
+        return record
 
 # Configure debug logging
 def setup_debug_logging():
-    """Set up a dedicated debug logger for controller inputs"""
+    """Set up a dedicated debug logger for controller inputs
+    
+    Records are written to debug.log by a background QueueListener, so
+    logging from the controller loop doesn't wait on file I/O.
+    """
+    global debug_log_listener
+    
     debug_logger = logging.getLogger('controller_debug')
     debug_logger.setLevel(logging.DEBUG)
     
+    # Keep records away from the root logger, whose handlers (if anything
+    # configures them) would write on the controller thread
+    debug_logger.propagate = False
+    
     # Create file handler for debug.log
     debug_file = logging.FileHandler('debug.log')
     debug_file.setLevel(logging.DEBUG)
@@ -185,8 +304,11 @@ def setup_debug_logging():
     formatter = logging.Formatter('%(asctime)s - %(message)s')
     debug_file.setFormatter(formatter)
     
-    # Add handler to logger
-    debug_logger.addHandler(debug_file)
+    # Add handler to logger through a queue drained by the listener thread
+    debug_queue = queue.SimpleQueue()
+    debug_logger.addHandler(DeferredQueueHandler(debug_queue))
+    debug_log_listener = QueueListener(debug_queue, debug_file)
+    debug_log_listener.start()
     
     return debug_logger
 
@@ -213,25 +335,159 @@ def setup_test_logging():
 debug_logger = setup_debug_logging()
 test_logger = setup_test_logging()
 
+def get_connection(**connect_args):
+    """Open a connection to the log database with the performance PRAGMAs applied"""
+    conn = sqlite3.connect(db_path, **connect_args)
+    cursor = conn.cursor()
+    
+    # Larger pages mean fewer page writes per logged batch; this only takes
+    # effect when the database file is first created, so it has to come
+    # before the WAL switch
+    cursor.execute("PRAGMA page_size=8192")
+    
+    # WAL lets readers (/api/logs) run alongside the writer and turns the
+    # per-commit fsyncs into sequential appends to the WAL file
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    
+    # Wait for a competing writer (e.g. clearing logs) instead of failing at once
+    cursor.execute("PRAGMA busy_timeout=5000")
+    
+    # 20 MB page cache keeps the recent end of servo_logs resident for /api/logs
+    cursor.execute("PRAGMA cache_size=-20000")
+    
+    return conn
+
+def get_reader_connection():
+    """Get the calling thread's read connection to the log database"""
+    conn = getattr(reader_local, 'conn', None)
+    if conn is None:
+        conn = get_connection()
+        reader_local.conn = conn
+    return conn
+
 def setup_database():
     """Initialize the SQLite database and tables"""
+    global log_conn
+    
     conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection()
         cursor = conn.cursor()
         
-        # Create table for servo logs
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS servo_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                servo_data TEXT,
-                mpu_data TEXT,
-                hardware_status TEXT
+        # Databases from before the columnar schema stored each entry as JSON
+        # text - move those rows, and any an earlier version left in
+        # servo_logs_legacy, to the JSON-format table database.py logs to
+        json_tables = []
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'servo_logs_legacy'")
+        if cursor.fetchone():
+            json_tables.append('servo_logs_legacy')
+        cursor.execute("PRAGMA table_info(servo_logs)")
+        if 'servo_data' in {column[1] for column in cursor.fetchall()}:
+            json_tables.append('servo_logs')
+        if json_tables:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {JSON_LOG_TABLE} (
+                    id INTEGER PRIMARY KEY,
+                    timestamp REAL,
+                    servo_data TEXT,
+                    mpu_data TEXT,
+                    hardware_status TEXT
+                )
+            ''')
+        for table in json_tables:
+            cursor.execute(
+                f"INSERT INTO {JSON_LOG_TABLE} (timestamp, servo_data, mpu_data, hardware_status) "
+                f"SELECT timestamp, servo_data, mpu_data, hardware_status FROM {table} ORDER BY id"
             )
+            cursor.execute(f"DROP TABLE {table}")
+            logger.info(f"Moved JSON-format log entries from {table} to {JSON_LOG_TABLE}")
+        
+        # Add the columns of servos that weren't configured when the table was created
+        cursor.execute("PRAGMA table_info(servo_logs)")
+        existing = {column[1] for column in cursor.fetchall()}
+        if existing:
+            for name, column_type in LOG_COLUMNS:
+                if name not in existing:
+                    cursor.execute(f"ALTER TABLE servo_logs ADD COLUMN {name} {column_type}")
+        
+        # Tables created with an AUTOINCREMENT key are rebuilt without it
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'servo_logs'")
+        row = cursor.fetchone()
+        rebuild = row is not None and 'AUTOINCREMENT' in row[0]
+        if rebuild:
+            cursor.execute("DROP VIEW IF EXISTS servo_logs_json")
+            cursor.execute("ALTER TABLE servo_logs RENAME TO servo_logs_rebuild")
+        
+        # Create table for servo logs, one column per logged value (LOG_COLUMNS).
+        # The id is a plain rowid alias - AUTOINCREMENT would update
+        # sqlite_sequence on every insert
+        columns = ", ".join(f"{name} {column_type}" for name, column_type in LOG_COLUMNS)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS servo_logs (id INTEGER PRIMARY KEY, {columns})")
+        
+        if rebuild:
+            cursor.execute(
+                f"INSERT INTO servo_logs (id, {LOG_COLUMN_NAMES}) "
+                f"SELECT id, {LOG_COLUMN_NAMES} FROM servo_logs_rebuild"
+            )
+            cursor.execute("DROP TABLE servo_logs_rebuild")
+            logger.info("Rebuilt servo_logs without AUTOINCREMENT")
+        
+        # JSON view of servo_logs in the layout served by /api/logs, recreated
+        # so it follows the configured servo channels
+        positions = ", ".join(f"s{ch}" for ch in SERVO_CHANNELS)
+        direction_names = " ".join(f"WHEN {code} THEN '{name}'" for code, name in enumerate(DIRECTION_NAMES))
+        hold_states = ", ".join(
+            f"json(CASE WHEN holds & {1 << ch} THEN 'true' ELSE 'false' END)" for ch in SERVO_CHANNELS
+        )
+        directions = ", ".join(f"CASE d{ch} {direction_names} END" for ch in SERVO_CHANNELS)
+        cursor.execute("DROP VIEW IF EXISTS servo_logs_json")
+        cursor.execute(f'''
+            CREATE VIEW servo_logs_json AS
+            SELECT id, json_object(
+                'id', id,
+                'timestamp', strftime('%Y-%m-%dT%H:%M:%f', timestamp, 'unixepoch', 'localtime'),
+                'servo_data', json_object(
+                    'positions', json_array({positions}),
+                    'hold_states', json_array({hold_states}),
+                    'directions', json_array({directions}),
+                    'speed', speed
+                ),
+                'mpu_data', json_object(
+                    'accel', json_object('x', accel_x, 'y', accel_y, 'z', accel_z),
+                    'gyro', json_object('x', gyro_x, 'y', gyro_y, 'z', gyro_z),
+                    'temp', temp,
+                    'direction', json_object(
+                        'x', CASE mpu_dir_x {direction_names} END,
+                        'y', CASE mpu_dir_y {direction_names} END,
+                        'z', CASE mpu_dir_z {direction_names} END
+                    )
+                ),
+                'hardware_status', json_object(
+                    'controller', json_object(
+                        'connected', json(CASE WHEN hw_flags & 4 THEN 'true' ELSE 'false' END),
+                        'type', controller_type
+                    ),
+                    'pca9685', json_object(
+                        'connected', json(CASE WHEN hw_flags & 1 THEN 'true' ELSE 'false' END),
+                        'bus', pca_bus
+                    ),
+                    'mpu6050', json_object(
+                        'connected', json(CASE WHEN hw_flags & 2 THEN 'true' ELSE 'false' END),
+                        'bus', mpu_bus
+                    )
+                )
+            ) AS entry
+            FROM servo_logs
         ''')
         
         conn.commit()
+        
+        # Persistent autocommit connection used by the log writer thread,
+        # which manages its own BEGIN/COMMIT around each batch
+        log_conn = get_connection(check_same_thread=False, isolation_level=None)
         return True
     except Error as e:
         logger.error(f"Database error: {e}")
@@ -240,54 +496,111 @@ def setup_database():
         if conn:
             conn.close()
 
+def get_servo_data():
+    """Get the servo state as JSON-serializable lists indexed by channel"""
+    return {
+        'positions': list(servo_positions),
+        'hold_states': [is_held(channel) for channel in range(NUM_SERVOS)],
+        'directions': [DIRECTION_NAMES[code] for code in servo_directions],
+        'speed': servo_speed
+    }
+
 def log_data():
-    """Log current data to the database"""
+    """Queue current data to be logged to the database"""
     try:
-        # Prepare data to be logged
-        timestamp = datetime.now().isoformat()
-        servo_data = {
-            'positions': servo_positions,
-            'hold_states': hold_state,
-            'directions': servo_directions,
-            'speed': servo_speed
-        }
-        
-        hardware_status = {
-            'controller': {
-                'connected': controller_connected,
-                'type': controller_type
-            },
-            'pca9685': {
-                'connected': pca_connected,
-                'bus': pca_bus
-            },
-            'mpu6050': {
-                'connected': mpu_connected,
-                'bus': mpu_bus
-            }
-        }
+        hw_flags = ((HW_FLAG_PCA9685 if pca_connected else 0)
+                    | (HW_FLAG_MPU6050 if mpu_connected else 0)
+                    | (HW_FLAG_CONTROLLER if controller_connected else 0))
         
-        # Convert to JSON
-        servo_json = json.dumps(servo_data)
-        mpu_json = json.dumps(mpu_data)
-        status_json = json.dumps(hardware_status)
+        accel = mpu_data['accel']
+        gyro = mpu_data['gyro']
+        positions = [servo_positions[channel] for channel in SERVO_CHANNELS]
+        holds = sum(1 << channel for channel in SERVO_CHANNELS if hold_state[channel])
+        directions = [servo_directions[channel] for channel in SERVO_CHANNELS]
         
-        # Store in database
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO servo_logs (timestamp, servo_data, mpu_data, hardware_status) VALUES (?, ?, ?, ?)",
-            (timestamp, servo_json, mpu_json, status_json)
-        )
-        conn.commit()
-        conn.close()
+        # Hand off to the log writer thread without ever blocking the caller
+        row = (time.time(), *positions, holds,
+               accel['x'], accel['y'], accel['z'], gyro['x'], gyro['y'], gyro['z'],
+               mpu_data['temp'], servo_speed, hw_flags, *directions, *mpu_direction_codes,
+               controller_type, pca_bus, mpu_bus)
+        try:
+            log_queue.put_nowait(row)
+        except queue.Full:
+            # Writer can't keep up (e.g. stalled SD card) - drop the oldest row
+            try:
+                log_queue.get_nowait()
+            except queue.Empty:
+                pass
+            log_queue.put_nowait(row)
         
     except Exception as e:
         logger.error(f"Logging error: {e}")
 
+def log_writer_thread():
+    """Thread for writing queued log rows to the database in batches"""
+    while not exit_event.is_set() or not log_queue.empty():
+        # Wait for the first row of the next batch
+        try:
+            rows = [log_queue.get(timeout=0.5)]
+        except queue.Empty:
+            continue
+        
+        # Collect more rows until the batch is full or has waited long enough
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while len(rows) < LOG_BATCH_SIZE:
+            if exit_event.is_set():
+                # Shutting down - batch up whatever is already queued without waiting
+                try:
+                    rows.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+                continue
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        # Write the whole batch in a single transaction, taking the write
+        # lock up front so a concurrent writer can't fail it mid-batch
+        try:
+            log_conn.execute("BEGIN IMMEDIATE")
+            log_conn.executemany(INSERT_LOG_SQL, rows)
+            log_conn.execute(PRUNE_LOG_SQL, (LOG_RETENTION_ROWS,))
+            log_conn.execute("COMMIT")
+        except Error as e:
+            logger.error(f"Logging error: {e}")
+            if log_conn.in_transaction:
+                log_conn.execute("ROLLBACK")
+    
+    # Refresh the query planner statistics for the next run
+    try:
+        log_conn.execute("PRAGMA optimize")
+    except Error as e:
+        logger.error(f"Database optimize error: {e}")
+    
+    # Closing the last connection checkpoints the WAL back into the database
+    log_conn.close()
+
+def start_log_writer():
+    """Start the background database log writer"""
+    global log_writer_handle
+    
+    if log_conn is None:
+        return None
+    
+    log_writer_handle = threading.Thread(target=log_writer_thread)
+    log_writer_handle.daemon = True
+    log_writer_handle.start()
+    return log_writer_handle
+
 def detect_i2c_devices():
     """Detect available I2C devices and initialize hardware"""
-    global pca_connected, mpu_connected, pca_bus, mpu_bus, pwm, mpu
+    global pca_connected, mpu_connected, pca_bus, mpu_bus, pwm, mpu, pca_auto_increment
+    global mpu_accel_scale, mpu_gyro_scale
     
     # Check each I2C bus
     for bus_num in I2C_BUSES:
@@ -302,6 +615,16 @@ def detect_i2c_devices():
                 print(f"PCA9685 found on I2C bus {bus_num}")
             except Exception as e:
                 print(f"PCA9685 not found on I2C bus {bus_num}: {e}")
+            
+            # Enable register auto-increment so several channels can be
+            # written in a single I2C transaction
+            if pca_connected:
+                try:
+                    mode1 = pwm._device.readU8(PCA9685_MODE1)
+                    pwm._device.write8(PCA9685_MODE1, (mode1 & 0x7F) | PCA9685_MODE1_AI)
+                    pca_auto_increment = True
+                except Exception as e:
+                    logger.warning(f"PCA9685 auto-increment unavailable, using per-channel writes: {e}")
         
         # Try to initialize MPU6050 on this bus
         if MPU6050_AVAILABLE and not mpu_connected:
@@ -315,6 +638,15 @@ def detect_i2c_devices():
                 print(f"MPU6050 found on I2C bus {bus_num}")
             except Exception as e:
                 print(f"MPU6050 not found on I2C bus {bus_num}: {e}")
+            
+            # Cache the scale factors for the ranges the sensor is set to,
+            # so burst reads don't need to query them
+            if mpu_connected:
+                try:
+                    mpu_accel_scale = MPU6050_GRAVITY / MPU6050_ACCEL_LSB[mpu.read_accel_range()]
+                    mpu_gyro_scale = 1 / MPU6050_GYRO_LSB[mpu.read_gyro_range()]
+                except Exception as e:
+                    logger.warning(f"Could not read MPU6050 ranges, assuming +/-2g and +/-250deg/s: {e}")
     
     # If hardware is still not connected, set up simulation
     if not pca_connected:
@@ -328,8 +660,10 @@ def find_game_controller():
     global controller_type, controller_connected
     
     try:
-        devices = [InputDevice(path) for path in evdev.list_devices()]
-        for device in devices:
+        # Open devices one at a time, stopping at the first controller and
+        # closing every device that isn't used
+        for path in evdev.list_devices():
+            device = InputDevice(path)
             if 'PLAYSTATION(R)3' in device.name or 'PlayStation 3' in device.name:
                 controller_type = 'PS3'
                 controller_connected = True
@@ -338,226 +672,366 @@ def find_game_controller():
                 controller_type = 'Xbox'
                 controller_connected = True
                 return device
+            device.close()
     except Exception as e:
         logger.error(f"Error finding controller: {e}")
     
     print("No game controller found. Using keyboard or web interface.")
     return None
 
+def _joystick_angle(value):
+    """Compute the servo angle (0-180) for a joystick value"""
+    return int(((value + 32767) / 65534) * 180)  # Normalize to 0-180 degrees
+
+def _angle_pulse(angle):
+    """Compute the PWM pulse length for an angle (0-180)"""
+    return int(SERVO_MIN + (angle / 180.0) * (SERVO_MAX - SERVO_MIN))
+
+# Lookup tables covering the full signed 16-bit joystick range, indexed by
+# value + JOYSTICK_OFFSET, so joystick events need no floating point math
+JOYSTICK_OFFSET = 32768
+JOYSTICK_LUT_LAST = 65535  # Highest table index; values past either end are clamped to it or 0
+JOYSTICK_ANGLE_LUT = array.array('B', [_joystick_angle(v - JOYSTICK_OFFSET) for v in range(65536)])
+ANGLE_PULSE_LUT = array.array('H', [_angle_pulse(angle) for angle in range(181)])
+JOYSTICK_PULSE_LUT = array.array('H', [ANGLE_PULSE_LUT[angle] for angle in JOYSTICK_ANGLE_LUT])
+
 def joystick_to_pwm(value):
     """Convert joystick value (-32767 to 32767) to servo pulse and angle"""
-    angle = int(((value + 32767) / 65534) * 180)  # Normalize to 0-180 degrees
-    pwm_value = int(SERVO_MIN + (angle / 180.0) * (SERVO_MAX - SERVO_MIN))
-    return pwm_value, angle
+    i = value + JOYSTICK_OFFSET
+    if i < 0:
+        i = 0
+    elif i > JOYSTICK_LUT_LAST:
+        i = JOYSTICK_LUT_LAST
+    return JOYSTICK_PULSE_LUT[i], JOYSTICK_ANGLE_LUT[i]
 
-def set_servo_position(channel, angle):
-    """Set a servo to a specific angle (0-180)"""
-    global servo_positions, servo_directions
-    
-    if channel not in SERVO_CHANNELS:
-        return False
-    
+def update_servo_state(channel, angle):
+    """Record a new servo angle and direction, returning its pulse length"""
     # Update direction
-    if angle > servo_positions[channel]:
-        servo_directions[channel] = "up" if channel in [1, 2] else "right"
-    elif angle < servo_positions[channel]:
-        servo_directions[channel] = "down" if channel in [1, 2] else "left"
+    previous = servo_positions[channel]
+    if angle > previous:
+        servo_directions[channel] = SERVO_DIR_INCREASE[channel]
+    elif angle < previous:
+        servo_directions[channel] = SERVO_DIR_DECREASE[channel]
     else:
-        servo_directions[channel] = "neutral"
+        servo_directions[channel] = DIR_NEUTRAL
     
     # Constrain the angle
-    angle = max(0, min(180, angle))
+    if angle < 0:
+        angle = 0
+    elif angle > 180:
+        angle = 180
     
-    # Calculate pulse length
-    pulse = int(SERVO_MIN + (angle / 180.0) * (SERVO_MAX - SERVO_MIN))
+    # Update position
+    servo_positions[channel] = angle
     
-    # Set the pulse
-    if pca_connected and pwm:
+    # Look up pulse length
+    return ANGLE_PULSE_LUT[angle]
+
+def set_servo_position(channel, angle, buffered=False):
+    """Set a servo to a specific angle (0-180)
+    
+    With buffered=True the pulse is left for the servo output thread to write
+    on its next cycle instead of being written to the PCA9685 immediately.
+    """
+    if channel not in SERVO_CHANNELS:
+        return False
+    
+    with servo_lock:
+        pulse = update_servo_state(channel, angle)
+        
+        # Set the pulse
+        if buffered:
+            pending_pulses[channel] = pulse
+        else:
+            # A direct command supersedes any buffered joystick target
+            pending_pulses[channel] = 0
+            if pulse != written_pulses[channel]:
+                write_servo_pulse(channel, pulse)
+    
+    return True
+
+def set_servo_positions(angles):
+    """Set several servos ({channel: angle}) with a single PCA9685 write"""
+    with servo_lock:
+        pulses = {}
+        for channel, angle in angles.items():
+            if channel in SERVO_CHANNELS:
+                pulse = update_servo_state(channel, angle)
+                pending_pulses[channel] = 0
+                if pulse != written_pulses[channel]:
+                    pulses[channel] = pulse
+        
+        if pulses:
+            set_pwms(pulses)
+
+def write_servo_pulse(channel, pulse):
+    """Write a pulse length to a servo channel on the PCA9685"""
+    with servo_lock:
+        if pca_connected and pwm:
+            try:
+                pwm.set_pwm(channel, 0, pulse)
+                written_pulses[channel] = pulse
+            except Exception as e:
+                logger.error(f"Error setting servo {channel}: {e}")
+
+def set_pwms(pulses):
+    """Write pulse lengths for several channels ({channel: pulse}) to the PCA9685
+    
+    Uses the PCA9685 register auto-increment to update every channel in one
+    I2C transaction. Channels in the written range that aren't being changed
+    are rewritten with their last pulse; if a channel has never been written
+    the channels are written one at a time instead.
+    """
+    with servo_lock:
+        if not (pca_connected and pwm):
+            return
+        
+        first = min(pulses)
+        last = max(pulses)
+        payload = []
+        if pca_auto_increment:
+            for channel in range(first, last + 1):
+                pulse = pulses.get(channel, written_pulses[channel])
+                if not pulse:
+                    payload = None
+                    break
+                # LEDn_ON_L, LEDn_ON_H, LEDn_OFF_L, LEDn_OFF_H
+                payload += (0, 0, pulse & 0xFF, pulse >> 8)
+        else:
+            payload = None
+        
+        if payload is None:
+            for channel, pulse in pulses.items():
+                write_servo_pulse(channel, pulse)
+            return
+        
         try:
-            pwm.set_pwm(channel, 0, pulse)
+            pwm._device.writeList(PCA9685_LED0_ON_L + 4 * first, payload)
+            for channel, pulse in pulses.items():
+                written_pulses[channel] = pulse
         except Exception as e:
-            logger.error(f"Error setting servo {channel}: {e}")
+            logger.error(f"Error setting servos {sorted(pulses)}: {e}")
+
+def servo_output_thread():
+    """Thread for writing buffered joystick targets to the servos once per PWM period"""
+    period = 1.0 / SERVO_FREQ
+    deadline = time.monotonic()
     
-    # Update position
-    servo_positions[channel] = angle
-    return True
+    while not exit_event.is_set():
+        with servo_lock:
+            # Only the latest target per channel matters - the servo can't follow
+            # changes faster than its PWM period anyway
+            pulses = {}
+            for channel in SERVO_CHANNELS:
+                pulse = pending_pulses[channel]
+                if pulse and pulse != written_pulses[channel]:
+                    pulses[channel] = pulse
+            
+            # Send every channel that moved this cycle in one I2C transaction
+            if pulses:
+                set_pwms(pulses)
+            
+        deadline += period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            exit_event.wait(delay)
+        else:
+            # Fell behind (e.g. slow I2C bus), restart the schedule from now
+            deadline = time.monotonic()
 
 def move_servo(channel, value):
     """Move a servo based on joystick input"""
-    global servo_positions, servo_directions, last_activity
-    
-    if lock_state or hold_state[channel]:
-        debug_logger.info(f"Servo {channel} movement blocked (locked:{lock_state}, hold:{hold_state[channel]})")
-        return  # Don't move if locked or held
-    
     # Store old position for logging
     old_position = servo_positions[channel]
     
     # Convert joystick value to servo position
-    pwm_value, angle = joystick_to_pwm(value)
+    # (some generic pads report 0..65535, so clamp to the table's range)
+    i = value + JOYSTICK_OFFSET
+    if i < 0:
+        i = 0
+    elif i > JOYSTICK_LUT_LAST:
+        i = JOYSTICK_LUT_LAST
+    angle = JOYSTICK_ANGLE_LUT[i]
+    
+    # Most stick events don't change the whole-degree angle - just mark the
+    # servo as settled, with nothing to write or log. Checked before the
+    # lock, so stick noise on a locked servo doesn't flood debug.log
+    if angle == old_position:
+        servo_directions[channel] = DIR_NEUTRAL
+        return
     
-    # Set servo position
-    set_servo_position(channel, angle)
+    if lock_state or hold_state[channel]:
+        debug_logger.info("Servo %s movement blocked (locked:%s, hold:%s)", channel, lock_state, is_held(channel))
+        return  # Don't move if locked or held
+    
+    # Set servo position, leaving the I2C write to the servo output thread
+    set_servo_position(channel, angle, buffered=True)
     
     # Log the movement
-    debug_logger.info(f"SERVO - Channel {channel} - From {old_position}° to {angle}° - Joystick value: {value}")
+    debug_logger.info("SERVO - Channel %s - From %s° to %s° - Joystick value: %s", channel, old_position, angle, value)
 
 def move_all_servos(angle):
     """Move all servos to a specified angle"""
-    global last_activity
-    
     if lock_state:
-        debug_logger.info(f"All servo movement blocked (locked)")
+        debug_logger.info("All servo movement blocked (locked)")
         return  # Don't move if locked
     
-    # Move each servo that isn't on hold
-    for channel in SERVO_CHANNELS:
-        if not hold_state[channel]:
-            old_position = servo_positions[channel]
-            set_servo_position(channel, angle)
-            debug_logger.info(f"SERVO - Channel {channel} - From {old_position}° to {angle}° - Global command")
+    with servo_lock:
+        # Move each servo that isn't on hold
+        pulses = {}
+        for channel in SERVO_CHANNELS:
+            if not hold_state[channel]:
+                old_position = servo_positions[channel]
+                pulses[channel] = update_servo_state(channel, angle)
+                pending_pulses[channel] = 0
+                debug_logger.info("SERVO - Channel %s - From %s° to %s° - Global command", channel, old_position, angle)
+        
+        # Write all the new pulses in one go
+        if pulses:
+            set_pwms(pulses)
 
 def log_controller_event(event_type, code, value, description=""):
     """Log controller events to debug.log"""
     try:
         if event_type == ecodes.EV_KEY:
             # Log button events
-            btn_name = "Unknown"
-            if controller_type == 'PS3':
-                btn_name = PS3_BUTTON_MAPPINGS.get(code, f"Unknown ({code})")
-            else:
-                # Xbox button names
-                btn_names = {
-                    ecodes.BTN_SOUTH: "A",
-                    ecodes.BTN_EAST: "B",
-                    ecodes.BTN_WEST: "X",
-                    ecodes.BTN_NORTH: "Y",
-                    ecodes.BTN_TL: "Left Shoulder",
-                    ecodes.BTN_TR: "Right Shoulder",
-                    ecodes.BTN_SELECT: "Select/Back",
-                    ecodes.BTN_START: "Start",
-                    ecodes.BTN_MODE: "Xbox Button",
-                    ecodes.BTN_THUMBL: "Left Thumb",
-                    ecodes.BTN_THUMBR: "Right Thumb",
-                }
-                btn_name = btn_names.get(code, f"Unknown ({code})")
+            btn_name = BUTTON_NAMES.get(controller_type, XBOX_BUTTON_NAMES).get(code)
+            if btn_name is None:
+                btn_name = f"Unknown ({code})"
             
             btn_state = "Pressed" if value == 1 else "Released" if value == 0 else "Held"
-            debug_logger.info(f"BUTTON - {btn_name} - {btn_state} - Code: {code}")
+            debug_logger.info("BUTTON - %s - %s - Code: %s", btn_name, btn_state, code)
             
         elif event_type == ecodes.EV_ABS:
             # Log joystick/axis events
-            axis_name = "Unknown"
-            
-            # Axis mappings
-            axis_names = {
-                0: "Left Stick X",
-                1: "Left Stick Y",
-                2: "Right Stick X (PS3-Z)",
-                3: "Right Stick Y (PS3-RX)",
-                4: "Right Stick Y (Xbox)",
-                5: "Right Stick X (Xbox)",
-                16: "D-pad X",
-                17: "D-pad Y",
-            }
-            
-            axis_name = axis_names.get(code, f"Unknown Axis ({code})")
-            debug_logger.info(f"AXIS - {axis_name} - Value: {value}")
+            axis_name = AXIS_NAMES.get(code)
+            if axis_name is None:
+                axis_name = f"Unknown Axis ({code})"
+            debug_logger.info("AXIS - %s - Value: %s", axis_name, value)
         
         # Add additional custom description if provided
         if description:
-            debug_logger.info(f"INFO - {description}")
+            debug_logger.info("INFO - %s", description)
     except Exception as e:
         logger.error(f"Error logging controller event: {e}")
 
-def get_direction_arrow(direction):
-    """Get arrow character based on direction"""
-    arrows = {
-        "up": "↑", "down": "↓",
-        "left": "←", "right": "→",
-        "neutral": "○"
-    }
-    return arrows.get(direction, "○")
+# Console status line, built once: per-servo fields followed by MPU and hardware fields
+STATUS_CLEAR = "\r\x1b[K"  # Carriage return, then erase to end of line
+STATUS_TEMPLATE = (
+    "".join(f"S{ch}:{{}}{{:3}}°{{}} " for ch in SERVO_CHANNELS)
+    + " | Accel: X:{}{:5.1f} Y:{}{:5.1f} Z:{}{:5.1f}"
+    + " | PCA:{}({}) MPU:{}({}) Ctrl:{} Spd:{:.1f}x"
+)
+last_status_text = None
 
 def display_status():
     """Display current status in console"""
-    # Clear the line (carriage return without newline)
-    sys.stdout.write("\r" + " " * 120 + "\r")
+    global last_status_text
     
-    # Hardware status
-    pca_status = "CONNECTED" if pca_connected else "DISCONNECTED"
-    mpu_status = "CONNECTED" if mpu_connected else "DISCONNECTED"
-    controller_status = f"{controller_type}" if controller_connected else "DISCONNECTED"
+    arrows = DIRECTION_ARROW_BY_CODE
     
     # Servo status
-    servo_text = ""
+    values = []
     for ch in SERVO_CHANNELS:
-        arrow = get_direction_arrow(servo_directions[ch])
-        lock = "L" if hold_state[ch] else " "
-        servo_text += f"S{ch}:{arrow}{servo_positions[ch]:3}°{lock} "
-    
-    # MPU data (if connected)
-    mpu_text = ""
-    if mpu_connected or True:  # Show in simulation mode too
-        ax = get_direction_arrow(mpu_data['direction']['x'])
-        ay = get_direction_arrow(mpu_data['direction']['y'])
-        az = get_direction_arrow(mpu_data['direction']['z'])
-        mpu_text = f"Accel: X:{ax}{mpu_data['accel']['x']:5.1f} Y:{ay}{mpu_data['accel']['y']:5.1f} Z:{az}{mpu_data['accel']['z']:5.1f}"
+        values += (
+            arrows[servo_directions[ch]],
+            servo_positions[ch],
+            "L" if hold_state[ch] else " "
+        )
+    
+    # MPU data (shown in simulation mode too)
+    accel = mpu_data['accel']
+    direction = mpu_direction_codes
+    values += (
+        arrows[direction[0]], accel['x'],
+        arrows[direction[1]], accel['y'],
+        arrows[direction[2]], accel['z']
+    )
     
     # Hardware status
-    hw_text = f"PCA:{pca_status}({pca_bus}) MPU:{mpu_status}({mpu_bus}) Ctrl:{controller_status} Spd:{servo_speed:.1f}x"
+    values += (
+        "CONNECTED" if pca_connected else "DISCONNECTED", pca_bus,
+        "CONNECTED" if mpu_connected else "DISCONNECTED", mpu_bus,
+        controller_type if controller_connected else "DISCONNECTED",
+        servo_speed
+    )
+    
+    # Skip the terminal write entirely when nothing visible has changed
+    status_text = STATUS_TEMPLATE.format(*values)
+    if status_text == last_status_text:
+        return
+    last_status_text = status_text
     
-    # Combine all text
-    status_text = f"{servo_text} | {mpu_text} | {hw_text}"
-    sys.stdout.write(status_text)
+    # Return to the start of the line, clear it and redraw
+    sys.stdout.write(STATUS_CLEAR + status_text)
     sys.stdout.flush()
 
+# MPU direction codes indexed by (value > threshold) - (value < -threshold) + 1
+MPU_X_DIRECTIONS = (DIR_LEFT, DIR_NEUTRAL, DIR_RIGHT)
+MPU_YZ_DIRECTIONS = (DIR_DOWN, DIR_NEUTRAL, DIR_UP)
+
+def set_mpu_directions(threshold):
+    """Set the MPU direction indicators from the current acceleration"""
+    accel = mpu_data['accel']
+    direction = mpu_data['direction']
+    x = accel['x']
+    y = accel['y']
+    z = accel['z']
+    codes = mpu_direction_codes
+    codes[0] = MPU_X_DIRECTIONS[(x > threshold) - (x < -threshold) + 1]
+    codes[1] = MPU_YZ_DIRECTIONS[(y > threshold) - (y < -threshold) + 1]
+    codes[2] = MPU_YZ_DIRECTIONS[(z > 9.8 + threshold) - (z < 9.8 - threshold) + 1]  # Z rests at 1g
+    direction['x'] = DIRECTION_NAMES[codes[0]]
+    direction['y'] = DIRECTION_NAMES[codes[1]]
+    direction['z'] = DIRECTION_NAMES[codes[2]]
+
 def update_mpu_data():
     """Update MPU6050 sensor data"""
     global mpu_data
     
     if mpu_connected and mpu:
         try:
-            # Read accelerometer data
-            accel_data = mpu.get_accel_data()
-            mpu_data['accel']['x'] = accel_data['x']
-            mpu_data['accel']['y'] = accel_data['y']
-            mpu_data['accel']['z'] = accel_data['z']
+            # Read accelerometer, temperature and gyroscope registers in a
+            # single I2C transaction instead of one per library call
+            raw = mpu.bus.read_i2c_block_data(mpu.address, MPU6050_ACCEL_XOUT_H, 14)
+            ax, ay, az, raw_temp, gx, gy, gz = struct.unpack('>7h', bytes(raw))
+            
+            accel_scale = mpu_accel_scale
+            accel_data = mpu_data['accel']
+            accel_data['x'] = ax * accel_scale
+            accel_data['y'] = ay * accel_scale
+            accel_data['z'] = az * accel_scale
             
-            # Read gyroscope data
-            gyro_data = mpu.get_gyro_data()
-            mpu_data['gyro']['x'] = gyro_data['x']
-            mpu_data['gyro']['y'] = gyro_data['y']
-            mpu_data['gyro']['z'] = gyro_data['z']
+            gyro_scale = mpu_gyro_scale
+            gyro_data = mpu_data['gyro']
+            gyro_data['x'] = gx * gyro_scale
+            gyro_data['y'] = gy * gyro_scale
+            gyro_data['z'] = gz * gyro_scale
             
-            # Read temperature
-            mpu_data['temp'] = mpu.get_temp()
+            mpu_data['temp'] = raw_temp / 340.0 + 36.53
             
             # Determine direction for visualization
-            threshold = 0.5  # Threshold for considering movement
-            mpu_data['direction']['x'] = "right" if accel_data['x'] > threshold else "left" if accel_data['x'] < -threshold else "neutral"
-            mpu_data['direction']['y'] = "up" if accel_data['y'] > threshold else "down" if accel_data['y'] < -threshold else "neutral"
-            mpu_data['direction']['z'] = "up" if accel_data['z'] > 9.8 + threshold else "down" if accel_data['z'] < 9.8 - threshold else "neutral"
+            set_mpu_directions(0.5)  # Threshold for considering movement
             
         except Exception as e:
             logger.error(f"Error reading MPU data: {e}")
     else:
-        # Simulation mode - generate some fake data
-        mpu_data['accel']['x'] = math.sin(time.time() * 0.5) * 0.5
-        mpu_data['accel']['y'] = math.cos(time.time() * 0.7) * 0.5
-        mpu_data['accel']['z'] = 9.8 + math.sin(time.time() * 0.3) * 0.2
+        # Simulation mode - generate some fake data from a single timestamp
+        t = time.time()
+        accel = mpu_data['accel']
+        gyro = mpu_data['gyro']
+        accel['x'] = sin(t * 0.5) * 0.5
+        accel['y'] = cos(t * 0.7) * 0.5
+        accel['z'] = 9.8 + sin(t * 0.3) * 0.2
         
-        mpu_data['gyro']['x'] = math.sin(time.time() * 0.2) * 2
-        mpu_data['gyro']['y'] = math.cos(time.time() * 0.4) * 2
-        mpu_data['gyro']['z'] = math.sin(time.time() * 0.6) * 2
+        gyro['x'] = sin(t * 0.2) * 2
+        gyro['y'] = cos(t * 0.4) * 2
+        gyro['z'] = sin(t * 0.6) * 2
         
-        mpu_data['temp'] = 25 + math.sin(time.time() * 0.1) * 0.5
+        mpu_data['temp'] = 25 + sin(t * 0.1) * 0.5
         
         # Determine direction for visualization
-        threshold = 0.3
-        mpu_data['direction']['x'] = "right" if mpu_data['accel']['x'] > threshold else "left" if mpu_data['accel']['x'] < -threshold else "neutral"
-        mpu_data['direction']['y'] = "up" if mpu_data['accel']['y'] > threshold else "down" if mpu_data['accel']['y'] < -threshold else "neutral"
-        mpu_data['direction']['z'] = "up" if mpu_data['accel']['z'] > 9.8 + threshold else "down" if mpu_data['accel']['z'] < 9.8 - threshold else "neutral"
+        set_mpu_directions(0.3)
 
 def run_controller_test_mode(gamepad):
     """Interactive controller test mode"""
@@ -597,57 +1071,33 @@ def run_controller_test_mode(gamepad):
             print(f"\n> {test_instruction}")
             test_logger.info(f"INSTRUCTION: {test_instruction}")
             
-            # Wait for events for 3 seconds
-            start_time = time.time()
-            while time.time() - start_time < 3:
-                events = gamepad.read_loop()
+            # Wait for events for 3 seconds, handling each burst as it arrives
+            deadline = time.monotonic() + 3
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                readable, _, _ = select.select([gamepad.fd], [], [], remaining)
+                if not readable:
+                    break
+                try:
+                    events = gamepad.read()
+                except BlockingIOError:
+                    continue
                 for event in events:
                     if event.type == ecodes.EV_KEY:
-                        btn_name = "Unknown"
-                        if controller_type == 'PS3':
-                            btn_name = PS3_BUTTON_MAPPINGS.get(event.code, f"Unknown ({event.code})")
-                        else:
-                            # Xbox button names using standard ecodes
-                            btn_names = {
-                                ecodes.BTN_SOUTH: "A",
-                                ecodes.BTN_EAST: "B",
-                                ecodes.BTN_WEST: "X",
-                                ecodes.BTN_NORTH: "Y",
-                                ecodes.BTN_TL: "Left Shoulder",
-                                ecodes.BTN_TR: "Right Shoulder",
-                                ecodes.BTN_SELECT: "Select/Back",
-                                ecodes.BTN_START: "Start",
-                                ecodes.BTN_MODE: "Xbox Button",
-                                ecodes.BTN_THUMBL: "Left Thumb",
-                                ecodes.BTN_THUMBR: "Right Thumb",
-                            }
-                            btn_name = btn_names.get(event.code, f"Unknown ({event.code})")
+                        btn_name = BUTTON_NAMES.get(controller_type, XBOX_BUTTON_NAMES).get(event.code, f"Unknown ({event.code})")
                         
                         btn_state = "Pressed" if event.value == 1 else "Released" if event.value == 0 else "Held"
                         test_logger.info(f"TEST - BUTTON - {btn_name} - {btn_state} - Code: {event.code}")
                         print(f"  Detected: {btn_name} ({event.code}) - {btn_state}")
                         
                     elif event.type == ecodes.EV_ABS:
-                        # Axis mappings
-                        axis_names = {
-                            0: "Left Stick X",
-                            1: "Left Stick Y",
-                            2: "Right Stick X (PS3-Z)",
-                            3: "Right Stick Y (PS3-RX)",
-                            4: "Right Stick Y (Xbox)",
-                            5: "Right Stick X (Xbox)",
-                            16: "D-pad X",
-                            17: "D-pad Y",
-                        }
-                        
-                        axis_name = axis_names.get(event.code, f"Unknown Axis ({event.code})")
+                        axis_name = AXIS_NAMES.get(event.code, f"Unknown Axis ({event.code})")
                         test_logger.info(f"TEST - AXIS - {axis_name} - Value: {event.value}")
                         if abs(event.value) > 1000:  # Only log significant movements
                             direction = "+" if event.value > 0 else "-"
                             print(f"  Detected: {axis_name} ({event.code}) - Direction: {direction}")
-                
-                # Short delay to prevent CPU overload
-                time.sleep(0.01)
             
             # Give user a short break between instructions
             time.sleep(0.5)
@@ -657,7 +1107,7 @@ def run_controller_test_mode(gamepad):
         print("Press Ctrl+C to exit or any key to continue to normal operation.")
         
         # Wait for a keypress or timeout
-        gamepad.wait_for_event(timeout=5)
+        select.select([gamepad.fd], [], [], 5)
         
     except KeyboardInterrupt:
         print("\nTest mode interrupted.")
@@ -667,162 +1117,300 @@ def run_controller_test_mode(gamepad):
     
     return
 
+def is_held(channel):
+    """Check whether a servo is on hold"""
+    return bool(hold_state[channel])
+
+def set_servo_hold(channel, hold):
+    """Put a single servo on hold or release it"""
+    hold_state[channel] = 1 if hold else 0
+
+def toggle_servo_hold(channel):
+    """Toggle the hold state of a single servo"""
+    hold_state[channel] ^= 1
+
+def toggle_lock():
+    """Toggle the global lock for all servos"""
+    global lock_state
+    lock_state = not lock_state
+
+def adjust_speed(steps):
+    """Change the servo speed multiplier by whole 0.1x steps within 0.1x-2.0x"""
+    global servo_speed, speed_step
+    speed_step = min(max(speed_step + steps, 1), MAX_SPEED_STEP)
+    servo_speed = SPEED_BY_STEP[speed_step]
+
+def decrease_speed():
+    """Decrease the servo speed multiplier"""
+    adjust_speed(-1)
+    print(f"\nSpeed decreased to {servo_speed:.1f}x")
+
+def increase_speed():
+    """Increase the servo speed multiplier"""
+    adjust_speed(1)
+    print(f"\nSpeed increased to {servo_speed:.1f}x")
+
+def request_exit(button):
+    """Exit once the given button has been pressed twice"""
+    global q_pressed
+    if q_pressed:
+        print(f"\n{button} pressed twice. Exiting...")
+        request_shutdown()
+    else:
+        q_pressed = True
+        print(f"\nPress {button} again to exit...")
+
+def handle_dpad_x(value):
+    """Handle the PS3 D-pad X axis"""
+    if value == -1:  # D-pad left
+        move_all_servos(0)
+    elif value == 1:  # D-pad right
+        move_all_servos(180)
+
+def handle_dpad_y(value):
+    """Handle the PS3 D-pad Y axis"""
+    if value == -1:  # D-pad up
+        move_all_servos(90)
+    elif value == 1:  # D-pad down
+        toggle_lock()
+
+# Joystick axis code -> servo channel
+PS3_AXIS_CHANNELS = {
+    0: 0,  # Left Stick X
+    1: 1,  # Left Stick Y
+    2: 2,  # Right Stick X (PS3-Z)
+    3: 3,  # Right Stick Y (PS3-RX)
+}
+
+XBOX_AXIS_CHANNELS = {
+    0: 0,  # Left Stick X
+    1: 1,  # Left Stick Y
+    5: 3,  # Right Stick X (Xbox)
+    4: 2,  # Right Stick Y (Xbox)
+}
+
+# Controller dispatch tables: event code -> handler
+# Axis handlers receive the event value, button handlers are called on press
+PS3_ABS_HANDLERS = {
+    16: handle_dpad_x,  # D-pad X axis
+    17: handle_dpad_y,  # D-pad Y axis
+}
+
+XBOX_ABS_HANDLERS = {}
+
+PS3_KEY_HANDLERS = {
+    304: partial(toggle_servo_hold, 0),  # Cross (✕)
+    305: partial(toggle_servo_hold, 1),  # Circle (○)
+    308: partial(toggle_servo_hold, 2),  # Square (□)
+    307: partial(toggle_servo_hold, 3),  # Triangle (△)
+    294: decrease_speed,                 # L1
+    295: increase_speed,                 # R1
+    298: partial(move_all_servos, 0),    # L2
+    299: partial(move_all_servos, 180),  # R2
+    291: partial(move_all_servos, 90),   # Start
+    300: partial(move_all_servos, 90),   # D-pad Up (direct button)
+    302: toggle_lock,                    # D-pad Down (direct button)
+    303: partial(move_all_servos, 0),    # D-pad Left (direct button)
+    301: partial(move_all_servos, 180),  # D-pad Right (direct button)
+    292: partial(request_exit, "PS button"),  # PS Button
+    ecodes.KEY_Q: partial(request_exit, "Q"),  # Q key
+}
+
+XBOX_KEY_HANDLERS = {
+    ecodes.BTN_SOUTH: partial(toggle_servo_hold, 0),        # A
+    ecodes.BTN_EAST: partial(toggle_servo_hold, 1),         # B
+    ecodes.BTN_WEST: partial(toggle_servo_hold, 2),         # X
+    ecodes.BTN_NORTH: partial(toggle_servo_hold, 3),        # Y
+    ecodes.BTN_TL: decrease_speed,                          # Left Shoulder
+    ecodes.BTN_TR: increase_speed,                          # Right Shoulder
+    ecodes.BTN_DPAD_UP: partial(move_all_servos, 90),       # Up D-pad
+    ecodes.BTN_DPAD_DOWN: toggle_lock,                      # Down D-pad
+    ecodes.BTN_DPAD_LEFT: partial(move_all_servos, 0),      # Left D-pad
+    ecodes.BTN_DPAD_RIGHT: partial(move_all_servos, 180),   # Right D-pad
+    ecodes.KEY_Q: partial(request_exit, "Q"),               # Q key
+}
+
+# Any controller that isn't a PS3 uses the Xbox layout
+AXIS_CHANNELS = {'PS3': PS3_AXIS_CHANNELS}
+ABS_HANDLERS = {'PS3': PS3_ABS_HANDLERS}
+KEY_HANDLERS = {'PS3': PS3_KEY_HANDLERS}
+
+def apply_stick_values(stick_values):
+    """Move servos to the coalesced stick values ({channel: value}) and clear them"""
+    for channel, value in stick_values.items():
+        try:
+            move_servo(channel, value)
+        except Exception as e:
+            logger.error("Error moving servo %s: %s", channel, e)
+    stick_values.clear()
+
 def handle_controller_input(gamepad):
     """Process input from game controller"""
-    global hold_state, servo_speed, q_pressed, exit_flag, lock_state
+    debug_logger.info("Controller connected: %s (%s)", gamepad.name, controller_type)
+    
+    # Select the dispatch tables once for the connected controller
+    axis_channels = AXIS_CHANNELS.get(controller_type, XBOX_AXIS_CHANNELS)
+    abs_handlers = ABS_HANDLERS.get(controller_type, XBOX_ABS_HANDLERS)
+    key_handlers = KEY_HANDLERS.get(controller_type, XBOX_KEY_HANDLERS)
+    EV_ABS = ecodes.EV_ABS
+    EV_KEY = ecodes.EV_KEY
     
-    debug_logger.info(f"Controller connected: {gamepad.name} ({controller_type})")
+    # Last stick value written to debug.log, per axis code
+    logged_sticks = {}
     
     try:
-        for event in gamepad.read_loop():
-            # Log all controller events
-            log_controller_event(event.type, event.code, event.value)
+        while not exit_event.is_set():
+            # Sleep until input arrives or request_shutdown() is called
+            readable, _, _ = select.select([gamepad.fd, exit_wake_r], [], [])
+            if gamepad.fd not in readable:
+                continue
             
-            # Check for exit flag
-            if exit_flag:
-                break
-                
+            # Drain every event queued since the last wake-up in one read
             try:
-                # Handle joystick movements
-                if event.type == ecodes.EV_ABS:
-                    # Left stick
-                    if event.code == 0:  # Left Stick X
-                        move_servo(0, event.value)
-                    elif event.code == 1:  # Left Stick Y
-                        move_servo(1, event.value)
-                    
-                    # Right stick - different mapping for PS3/Xbox
-                    if controller_type == 'PS3':
-                        if event.code == 2:  # Right Stick X (PS3-Z)
-                            move_servo(2, event.value)
-                        elif event.code == 3:  # Right Stick Y (PS3-RX)
-                            move_servo(3, event.value)
-                    else:  # Xbox
-                        if event.code == 5:  # Right Stick X (Xbox)
-                            move_servo(3, event.value)
-                        elif event.code == 4:  # Right Stick Y (Xbox)
-                            move_servo(2, event.value)
-                    
-                    # PS3 D-pad via axes
-                    if controller_type == 'PS3':
-                        if event.code == 16:  # D-pad X axis
-                            if event.value == -1:  # D-pad left
-                                move_all_servos(0)
-                            elif event.value == 1:  # D-pad right
-                                move_all_servos(180)
-                        elif event.code == 17:  # D-pad Y axis
-                            if event.value == -1:  # D-pad up
-                                move_all_servos(90)
-                            elif event.value == 1:  # D-pad down
-                                lock_state = not lock_state
+                events = gamepad.read()
+            except BlockingIOError:
+                continue
+            
+            # Stick values are absolute positions, so only the last value of
+            # each stick axis is passed on to its servo - before the next
+            # button or D-pad event, or at the end of the burst
+            stick_values = {}
+            
+            for event in events:
+                # Only buttons and axes carry input - sync markers and
+                # EV_MSC scan codes (sent with every button) are dropped
+                if event.type != EV_KEY and event.type != EV_ABS:
+                    continue
                 
-                # Handle button presses
-                elif event.type == ecodes.EV_KEY and event.value == 1:  # Button pressed
-                    # Handle PS3 controller buttons
-                    if controller_type == 'PS3':
-                        if event.code == 304:  # Cross (✕)
-                            hold_state[0] = not hold_state[0]
-                        elif event.code == 305:  # Circle (○)
-                            hold_state[1] = not hold_state[1]
-                        elif event.code == 308:  # Square (□)
-                            hold_state[2] = not hold_state[2]
-                        elif event.code == 307:  # Triangle (△)
-                            hold_state[3] = not hold_state[3]
-                        elif event.code == 294:  # L1
-                            servo_speed = max(servo_speed - 0.1, 0.1)
-                            print(f"\nSpeed decreased to {servo_speed:.1f}x")
-                        elif event.code == 295:  # R1
-                            servo_speed = min(servo_speed + 0.1, 2.0)
-                            print(f"\nSpeed increased to {servo_speed:.1f}x")
-                        elif event.code == 298:  # L2
-                            move_all_servos(0)
-                        elif event.code == 299:  # R2
-                            move_all_servos(180)
-                        elif event.code == 291:  # Start
-                            move_all_servos(90)
-                        elif event.code == 300:  # D-pad Up (direct button)
-                            move_all_servos(90)
-                        elif event.code == 302:  # D-pad Down (direct button)
-                            lock_state = not lock_state
-                        elif event.code == 303:  # D-pad Left (direct button)
-                            move_all_servos(0)
-                        elif event.code == 301:  # D-pad Right (direct button)
-                            move_all_servos(180)
-                    else:
-                        # Xbox controller buttons
-                        if event.code == ecodes.BTN_SOUTH:  # A
-                            hold_state[0] = not hold_state[0]
-                        elif event.code == ecodes.BTN_EAST:  # B
-                            hold_state[1] = not hold_state[1]
-                        elif event.code == ecodes.BTN_WEST:  # X
-                            hold_state[2] = not hold_state[2]
-                        elif event.code == ecodes.BTN_NORTH:  # Y
-                            hold_state[3] = not hold_state[3]
-                        elif event.code == ecodes.BTN_TL:  # Left Shoulder
-                            servo_speed = max(servo_speed - 0.1, 0.1)
-                            print(f"\nSpeed decreased to {servo_speed:.1f}x")
-                        elif event.code == ecodes.BTN_TR:  # Right Shoulder
-                            servo_speed = min(servo_speed + 0.1, 2.0)
-                            print(f"\nSpeed increased to {servo_speed:.1f}x")
-                        elif event.code == ecodes.BTN_DPAD_UP:  # Up D-pad
-                            move_all_servos(90)
-                        elif event.code == ecodes.BTN_DPAD_DOWN:  # Down D-pad
-                            lock_state = not lock_state
-                        elif event.code == ecodes.BTN_DPAD_LEFT:  # Left D-pad
-                            move_all_servos(0)
-                        elif event.code == ecodes.BTN_DPAD_RIGHT:  # Right D-pad
-                            move_all_servos(180)
-                    
-                    # Check for 'Q' key (or PS button on PS3) for exit
-                    if (event.code == ecodes.KEY_Q) or (controller_type == 'PS3' and event.code == 292):
-                        if q_pressed:
-                            print("\nQ pressed twice. Exiting...")
-                            exit_flag = True
-                            break
+                # Log controller events, skipping small stick movements
+                if event.type == EV_ABS and event.code in axis_channels:
+                    last = logged_sticks.get(event.code)
+                    if last is None or abs(event.value - last) > STICK_LOG_DEADBAND:
+                        logged_sticks[event.code] = event.value
+                        log_controller_event(event.type, event.code, event.value)
+                else:
+                    log_controller_event(event.type, event.code, event.value)
+                
+                # Check for exit flag
+                if exit_event.is_set():
+                    break
+                
+                try:
+                    # Handle joystick movements
+                    if event.type == EV_ABS:
+                        channel = axis_channels.get(event.code)
+                        if channel is not None:
+                            stick_values[channel] = event.value
                         else:
-                            q_pressed = True
-                            print("\nPress Q again to exit...")
-            except Exception as e:
-                # Log the error but continue processing events
-                logger.error(f"Error processing controller event: {e}")
-                debug_logger.error(f"ERROR - {e} - Event: {event}")
+                            handler = abs_handlers.get(event.code)
+                            if handler:
+                                # Earlier stick moves happened first
+                                apply_stick_values(stick_values)
+                                handler(event.value)
+                    
+                    # Handle button presses
+                    elif event.type == EV_KEY and event.value == 1:
+                        handler = key_handlers.get(event.code)
+                        if handler:
+                            # Earlier stick moves happened first - a hold or
+                            # lock press must not block them
+                            apply_stick_values(stick_values)
+                            handler()
+                except Exception as e:
+                    # Log the error but continue processing events
+                    logger.error("Error processing controller event: %s", e)
+                    debug_logger.error("ERROR - %s - Event: %s", e, event)
+            
+            apply_stick_values(stick_values)
+            
+            # Have the update thread redraw once for the whole burst
+            display_dirty.set()
     
     except Exception as e:
-        logger.error(f"Controller error: {e}")
+        logger.error("Controller error: %s", e)
         print(f"\nController error: {e}")
-        exit_flag = True
+        request_shutdown()
 
 def update_thread():
     """Thread for updating sensor data and display"""
-    global exit_flag
+    global status_tick
     
-    while not exit_flag:
+    # Monotonic deadline so wall-clock jumps (NTP) and scheduling jitter
+    # can't cause duplicate or skipped log entries
+    next_log = time.monotonic() + LOG_INTERVAL
+    
+    # Fixed-rate schedule: each tick waits only for what's left of its interval
+    deadline = time.monotonic() + UPDATE_INTERVAL
+    
+    while not exit_event.is_set():
         # Update MPU data
         update_mpu_data()
         
         # Display status
         display_status()
         
+        # Invalidate the cached web status
+        status_tick += 1
+        
         # Log data to the database (lower frequency to avoid overwhelming the DB)
-        if int(time.time()) % 5 == 0:  # Log every 5 seconds
+        now = time.monotonic()
+        if now >= next_log:
             log_data()
+            # Advance by whole intervals so the cadence doesn't drift with
+            # tick jitter, skipping any entries missed while stalled
+            next_log += LOG_INTERVAL
+            if next_log <= now:
+                next_log = now + LOG_INTERVAL
+        
+        # Fell behind, restart the schedule from now
+        if deadline < time.monotonic():
+            deadline = time.monotonic()
         
-        # Sleep to control update rate
-        time.sleep(0.1)
+        # Wait for the next tick, redrawing early whenever controller input
+        # arrives so the console follows the sticks between sensor updates
+        while True:
+            delay = deadline - time.monotonic()
+            if delay <= 0 or not display_dirty.wait(delay) or exit_event.is_set():
+                break
+            display_dirty.clear()
+            display_status()
+            
+            # Limit how often input bursts can force a redraw
+            if exit_event.wait(min(DISPLAY_MIN_INTERVAL, max(deadline - time.monotonic(), 0))):
+                break
+        deadline += UPDATE_INTERVAL
+
+def request_shutdown():
+    """Tell every thread to stop, waking the ones waiting for input"""
+    exit_event.set()
+    display_dirty.set()  # Wake the update thread
+    try:
+        os.write(exit_wake_w, b'\0')
+    except BlockingIOError:
+        pass  # A wake-up is already pending
 
 def exit_handler(signal_received=None, frame=None):
     """Handle program exit gracefully"""
-    global exit_flag
-    
     print("\nExiting program.")
-    exit_flag = True
+    request_shutdown()
+    
+    # Wait for the workers to see exit_event, so none of them writes to the
+    # servos after they are turned off below
+    for handle in (update_thread_handle, servo_output_handle):
+        if handle:
+            handle.join(timeout=1.0)
+    
+    # Give the log writer a chance to flush any queued rows
+    if log_writer_handle:
+        log_writer_handle.join(timeout=1.0)
+    
+    # Write out any queued debug log records
+    debug_log_listener.stop()
     
     # Turn off all servos
     if pca_connected and pwm:
         pwm.set_all_pwm(0, 0)
     
-    # Exit after a short delay to allow threads to close
-    time.sleep(0.5)
     sys.exit(0)
 
 # Flask routes for web interface
@@ -831,16 +1419,10 @@ def index():
     """Serve the main web interface"""
     return render_template('servo_controller.html')
 
-@app.route('/api/status')
-def get_status():
-    """API endpoint to get current status"""
-    status = {
-        'servos': {
-            'positions': servo_positions,
-            'hold_states': hold_state,
-            'directions': servo_directions,
-            'speed': servo_speed
-        },
+def build_status():
+    """Build the status dictionary served by /api/status"""
+    return {
+        'servos': get_servo_data(),
         'mpu': mpu_data,
         'hardware': {
             'pca_connected': pca_connected,
@@ -851,7 +1433,22 @@ def get_status():
             'controller_type': controller_type
         }
     }
-    return jsonify(status)
+
+@app.route('/api/status')
+def get_status():
+    """API endpoint to get current status"""
+    global status_cache
+    
+    # Serialize once per tick, however many clients poll, and not at all
+    # while nobody is polling. The tick is read first, so a status built
+    # across a tick change is cached under the older tick and rebuilt.
+    tick = status_tick
+    cached_tick, body = status_cache
+    if cached_tick != tick:
+        body = dumps_bytes(build_status())
+        # Rebinding the global is atomic, so readers never see a partial update
+        status_cache = (tick, body)
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/servo/<int:channel>', methods=['POST'])
 def control_servo(channel):
@@ -870,6 +1467,23 @@ def control_servo(channel):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/servo/bulk', methods=['POST'])
+def control_servos_bulk():
+    """API endpoint to set every servo in one request ({"angles": [a0, a1, ...]})"""
+    data = request.get_json()
+    if not data or 'angles' not in data:
+        return jsonify({'error': 'Missing angles parameter'}), 400
+    
+    try:
+        angles = [int(angle) for angle in data['angles']]
+        if len(angles) != len(SERVO_CHANNELS):
+            return jsonify({'error': f'Expected {len(SERVO_CHANNELS)} angles'}), 400
+        
+        set_servo_positions(dict(zip(SERVO_CHANNELS, angles)))
+        return jsonify({'success': True, 'angles': angles})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/servo/all', methods=['POST'])
 def control_all_servos():
     """API endpoint to control all servos"""
@@ -893,11 +1507,11 @@ def toggle_hold(channel):
     try:
         data = request.get_json()
         if data and 'hold' in data:
-            hold_state[channel] = bool(data['hold'])
+            set_servo_hold(channel, data['hold'])
         else:
-            hold_state[channel] = not hold_state[channel]
+            toggle_servo_hold(channel)
         
-        return jsonify({'success': True, 'channel': channel, 'hold': hold_state[channel]})
+        return jsonify({'success': True, 'channel': channel, 'hold': is_held(channel)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -905,40 +1519,58 @@ def toggle_hold(channel):
 def get_logs():
     """API endpoint to get log data"""
     try:
-        conn = sqlite3.connect(db_path)
+        limit = request.args.get('limit', default=100, type=int)
+        offset = request.args.get('offset', default=0, type=int)
+        
+        conn = get_reader_connection()
         cursor = conn.cursor()
         
-        # Get the most recent 100 log entries
-        cursor.execute("SELECT * FROM servo_logs ORDER BY id DESC LIMIT 100")
-        rows = cursor.fetchall()
-        
-        logs = []
-        for row in rows:
-            log_entry = {
-                'id': row[0],
-                'timestamp': row[1],
-                'servo_data': json.loads(row[2]),
-                'mpu_data': json.loads(row[3]),
-                'hardware_status': json.loads(row[4])
-            }
-            logs.append(log_entry)
-        
-        conn.close()
-        return jsonify(logs)
+        # Get the most recent log entries, newest first, already encoded
+        # as JSON by the servo_logs_json view
+        cursor.execute(
+            "SELECT entry FROM servo_logs_json ORDER BY id DESC LIMIT ? OFFSET ?",
+            (max(limit, 0), max(offset, 0))
+        )
+        body = "[" + ",".join(row[0] for row in cursor.fetchall()) + "]"
+        return Response(body, mimetype='application/json')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/logs/stats')
+def get_log_stats():
+    """API endpoint to get per-servo position statistics over recent logs"""
+    try:
+        limit = request.args.get('limit', default=100, type=int)
+        
+        cursor = get_reader_connection().cursor()
+        cursor.execute(POSITION_STATS_SQL, (max(limit, 0),))
+        row = cursor.fetchone()
+        
+        return jsonify({
+            'count': row[0],
+            'servos': [
+                {'min': row[1 + 3 * ch], 'max': row[2 + 3 * ch], 'mean': row[3 + 3 * ch]}
+                for ch in SERVO_CHANNELS
+            ]
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 def start_web_server():
     """Start the Flask web server"""
     try:
-        app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+        if WAITRESS_AVAILABLE:
+            # Multi-threaded production WSGI server
+            serve(app, host='0.0.0.0', port=5000, threads=4, _quiet=True)
+        else:
+            app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False, threaded=True)
     except Exception as e:
         logger.error(f"Web server error: {e}")
         print(f"Error starting web server: {e}")
 
 def main():
     """Main function"""
-    global exit_flag
+    global update_thread_handle, servo_output_handle
     
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description='Servo Controller with MPU6050')
@@ -950,8 +1582,9 @@ def main():
     # Register signal handler for Ctrl+C
     signal.signal(signal.SIGINT, exit_handler)
     
-    # Set up database
+    # Set up database and start the background log writer
     setup_database()
+    start_log_writer()
     
     # Detect I2C devices
     detect_i2c_devices()
@@ -990,6 +1623,12 @@ def main():
     update_thread_handle.daemon = True
     update_thread_handle.start()
     
+    # Start servo output thread for buffered joystick movements
+    if pca_connected:
+        servo_output_handle = threading.Thread(target=servo_output_thread)
+        servo_output_handle.daemon = True
+        servo_output_handle.start()
+    
     # Start web server in a separate thread
     web_thread = threading.Thread(target=start_web_server)
     web_thread.daemon = True
@@ -1007,8 +1646,7 @@ def main():
         handle_controller_input(gamepad)
     else:
         # Just keep the main thread alive
-        while not exit_flag:
-            time.sleep(0.1)
+        exit_event.wait()
     
     # Clean exit
     exit_handler()
@@ -3,6 +3,7 @@
 Controller test functionality for PS3 controller.
 """
 
+import select
 import time
 import sys
 from evdev import ecodes
@@ -53,14 +54,19 @@ def run_controller_test_mode(gamepad):
             test_logger.info(f"INSTRUCTION: {test_instruction}")
             
             # Wait for events for 5 seconds or until significant input detected
-            start_time = time.time()
+            deadline = time.monotonic() + 5
             detected = False
             
-            while time.time() - start_time < 5 and not detected:
+            while not detected:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
                 try:
-                    # Poll for events
-                    event = gamepad.read_one()
-                    if event:
+                    # Block until the controller has input, then handle everything queued
+                    readable, _, _ = select.select([gamepad.fd], [], [], remaining)
+                    if not readable:
+                        break
+                    for event in gamepad.read():
                         if event.type == ecodes.EV_KEY and event.value == 1:  # Button down
                             btn_name = PS3_BUTTON_MAPPINGS.get(event.code, f"Unknown ({event.code})")
                             test_logger.info(f"TEST - BUTTON - {btn_name} - Pressed - Code: {event.code}")
@@ -82,9 +88,11 @@ def run_controller_test_mode(gamepad):
                             # Store in results
                             results[test_instruction] = (axis_name, event.code)
                             detected = True
-                            
-                    # Short sleep to avoid CPU thrashing
-                    time.sleep(0.01)
+                        
+                        if detected:
+                            break
+                except BlockingIOError:
+                    continue
                 except Exception as e:
                     test_logger.error(f"Error reading event: {e}")
                     time.sleep(0.01)
@@ -3,8 +3,10 @@
 Flask web interface for servo controller.
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
+import json
 import threading
+import time
 
 from config import WEB_HOST, WEB_PORT
 from logger import main_logger
@@ -14,22 +16,55 @@ from hardware import (
     set_servo_position, 
     stop_all_servos, 
     get_hardware_status,
+    invalidate_hardware_status,
     servo_positions,
     hold_state,
-    lock_state,
+    set_lock_state,
+    toggle_lock_state,
     SERVO_CHANNELS
 )
-from database import get_recent_logs
+from database import get_recent_logs_json
 from controller_input import get_controller_status
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from waitress import serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    print("Warning: waitress not found. Using the Flask development server.")
+    WAITRESS_AVAILABLE = False
+
+# JSON serialization, using orjson when it's installed
+if ORJSON_AVAILABLE:
+    def dumps_bytes(obj):
+        """Serialize an object to JSON bytes"""
+        return orjson.dumps(obj)
+else:
+    def dumps_bytes(obj):
+        """Serialize an object to JSON bytes"""
+        return json.dumps(obj).encode()
+
 # Initialize Flask app
 app = Flask(__name__)
 
+# Serialized /api/status body, reused by polls arriving within STATUS_CACHE_TTL
+STATUS_CACHE_TTL = 0.05  # Seconds
+status_cache = (0.0, None)  # (monotonic expiry time, JSON bytes)
+
 def start_web_server():
     """Start the Flask web server"""
     try:
-        app.run(host=WEB_HOST, port=WEB_PORT, debug=False, use_reloader=False)
-        main_logger.info(f"Web server started at http://{WEB_HOST}:{WEB_PORT}/")
+        main_logger.info(f"Web server starting at http://{WEB_HOST}:{WEB_PORT}/")
+        if WAITRESS_AVAILABLE:
+            # Multi-threaded production WSGI server
+            serve(app, host=WEB_HOST, port=WEB_PORT, threads=4, _quiet=True)
+        else:
+            app.run(host=WEB_HOST, port=WEB_PORT, debug=False, use_reloader=False, threaded=True)
     except Exception as e:
         main_logger.error(f"Web server error: {e}")
         print(f"Error starting web server: {e}")
@@ -43,6 +78,13 @@ def index():
 @app.route('/api/status')
 def get_status():
     """API endpoint to get current status"""
+    global status_cache
+    
+    now = time.monotonic()
+    expires, body = status_cache
+    if body is not None and now < expires:
+        return Response(body, mimetype='application/json')
+    
     hw_status = get_hardware_status()
     controller_status = get_controller_status()
     
@@ -63,7 +105,9 @@ def get_status():
             'controller_type': controller_status['type']
         }
     }
-    return jsonify(status)
+    body = dumps_bytes(status)
+    status_cache = (now + STATUS_CACHE_TTL, body)
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/servo/<int:channel>', methods=['POST'])
 def control_servo(channel):
@@ -118,11 +162,12 @@ def toggle_hold(channel):
             hold_state[channel] = bool(data['hold'])
         else:
             hold_state[channel] = not hold_state[channel]
+        invalidate_hardware_status()
         
         return jsonify({
             'success': True, 
             'channel': channel, 
-            'hold': hold_state[channel]
+            'hold': bool(hold_state[channel])
         })
     except Exception as e:
         main_logger.error(f"API error when toggling hold: {e}")
@@ -131,14 +176,12 @@ def toggle_hold(channel):
 @app.route('/api/servo/lock', methods=['POST'])
 def toggle_lock():
     """API endpoint to toggle global lock state"""
-    global lock_state
-    
     try:
         data = request.get_json()
         if data and 'lock' in data:
-            lock_state = bool(data['lock'])
+            lock_state = set_lock_state(data['lock'])
         else:
-            lock_state = not lock_state
+            lock_state = toggle_lock_state()
         
         return jsonify({
             'success': True, 
@@ -153,8 +196,7 @@ def get_logs():
     """API endpoint to get log data"""
     try:
         limit = request.args.get('limit', default=100, type=int)
-        logs = get_recent_logs(limit)
-        return jsonify(logs)
+        return Response(get_recent_logs_json(limit), mimetype='application/json')
     except Exception as e:
         main_logger.error(f"API error when retrieving logs: {e}")
         return jsonify({'error': str(e)}), 500